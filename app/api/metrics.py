@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, Request, status
+from app.core import metrics
+from app.core.response import create_success_response
+from app.core.security import get_current_admin
+from app.models.user import User
+from app.schemas.user import StandardResponse
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"]
+)
+
+
+@router.get("/", status_code=status.HTTP_200_OK, response_model=StandardResponse)
+def get_metrics(request: Request, current_admin: User = Depends(get_current_admin)):
+    return create_success_response(
+        data=metrics.snapshot(),
+        message="Metrics retrieved successfully.",
+        request_id=request.state.request_id
+    )
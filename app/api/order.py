@@ -1,14 +1,17 @@
-from app.core.database import get_db
-from app.core.security import get_current_driver, get_current_user
-from fastapi import APIRouter, Depends, status, UploadFile, File, Request, Form, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
+from app.core.database import get_db, get_read_db
+from app.core.security import get_current_admin, get_current_driver, get_current_user
+from fastapi import APIRouter, Depends, status, UploadFile, File, Request, Form, HTTPException, BackgroundTasks, Query
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import User
 import json
 from app.schemas.user import StandardResponse
 from uuid import UUID
-from app.schemas.order import GeoPoint, OrderOut, OrderCreate, OrderFullOut, ProofOfDeliveryOut
-from app.services.order import create_order_service, upload_proof_of_delivery_service, get_order_service
-from app.services.logistics import assign_driver_to_order_service, update_driver_location_service
+from app.schemas.order import GeoPoint, LocationBatch, OrderOut, OrderCreate, OrderFullOut, ProofOfDeliveryOut, OrderStatusUpdate, OrderPage
+from app.models.order import OrderStatus
+from app.services.order import create_order_service, upload_proof_of_delivery_service, get_order_service, update_order_status_service, list_orders_service, export_orders_service
+from datetime import datetime
+from app.services.logistics import assign_driver_to_order_service, update_driver_location_service, ingest_driver_locations_service
 
 router = APIRouter(
     prefix="/order",
@@ -16,13 +19,23 @@ router = APIRouter(
 )
 
 @router.post("/location", status_code=status.HTTP_200_OK)
-def update_location_route(
+async def update_location_route(
     request: Request,
     location: GeoPoint,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_driver: User = Depends(get_current_driver)
 ):
-    return update_driver_location_service(request, location, db, current_driver)
+    return await update_driver_location_service(request, location, db, current_driver)
+
+
+@router.post("/location/batch", status_code=status.HTTP_200_OK)
+async def ingest_locations_route(
+    request: Request,
+    batch: LocationBatch,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return await ingest_driver_locations_service(request, batch, db, current_user)
 
 
 
@@ -35,7 +48,7 @@ async def create_order(
     background_tasks: BackgroundTasks,
     order: str = Form(...), 
     goods_image: UploadFile =File(None),
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_db), 
 
     current_customer: User = Depends(get_current_user)
 ):
@@ -49,9 +62,36 @@ async def create_order(
 
 
 
-@router.post("/{order_id}/update-status", response_model=OrderOut)
-def update_order_status_service(request: Request, order_id: int, status: OrderOut, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return update_order_status_service(request, order_id, status, db, current_user)
+@router.get("/", response_model=StandardResponse[OrderPage])
+async def list_orders(
+    request: Request,
+    customer_id: Optional[UUID] = None,
+    driver_id: Optional[UUID] = None,
+    order_status: Optional[OrderStatus] = Query(None, alias="status"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    return await list_orders_service(request, db, current_user, customer_id, driver_id, order_status, limit, cursor)
+
+
+@router.get("/export")
+async def export_orders(
+    request: Request,
+    export_format: str = Query("ndjson", alias="format"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    order_status: Optional[OrderStatus] = Query(None, alias="status"),
+    current_admin: User = Depends(get_current_admin)
+):
+    return await export_orders_service(request, export_format, created_from, created_to, order_status)
+
+
+
+@router.post("/{order_id}/update-status", response_model=StandardResponse[OrderOut])
+async def update_order_status(request: Request, order_id: UUID, status_update: OrderStatusUpdate, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    return await update_order_status_service(request, order_id, status_update.status, db, current_user)
 
 
 
@@ -62,23 +102,23 @@ async def upload_proof_of_delivery(
     order_id: int,
     image: UploadFile = File(None),
     signature: UploadFile = File(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_driver: User = Depends(get_current_driver)
 ):
-    return upload_proof_of_delivery_service(request,order_id, image, signature, db, current_driver)
+    return await upload_proof_of_delivery_service(request,order_id, image, signature, db, current_driver)
 
 
 
-@router.get("/{order_id}", response_model=OrderFullOut)
-def get_order(request: Request, order_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return get_order_service(request, order_id, db, current_user)
+@router.get("/{order_id}", response_model=StandardResponse[OrderFullOut])
+async def get_order(request: Request, order_id: UUID, db: AsyncSession = Depends(get_read_db), current_user: User = Depends(get_current_user)):
+    return await get_order_service(request, order_id, db, current_user)
 
 
 @router.post("/{order_id}/assign-driver", response_model=StandardResponse, status_code=status.HTTP_200_OK)
 async def assign_driver_to_order_endpoint(
     order_id: UUID,
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_dispatcher: User = Depends(get_current_driver)
 ):
     return await assign_driver_to_order_service(
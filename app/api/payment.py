@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, status, Request, BackgroundTasks
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import User
 from app.core.database import get_db
 from app.core.security import get_current_driver, get_current_user
-from app.services.payment import initialize_payment_service, verify_payment_service
-from sqlalchemy.orm import Session
+from app.services.payment import initialize_payment_service, verify_payment_service, quote_prices_service
+from app.schemas.payment import QuoteRequest
+from app.schemas.user import StandardResponse
 from uuid import UUID
 
 router = APIRouter(
@@ -16,7 +17,7 @@ router = APIRouter(
 async def initialize_payment(
     request: Request,
     order_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_customer: User = Depends(get_current_user),
 ):
     return await initialize_payment_service(request, order_id, db, current_customer)
@@ -27,9 +28,16 @@ async def verify_payment(
     request: Request,
     background_tasks:BackgroundTasks,
     reference: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_customer: User = Depends(get_current_user)
 ):
     return await verify_payment_service(request,background_tasks, reference, db,current_customer)
-    
 
+
+@router.post("/quotes", status_code=status.HTTP_200_OK, response_model=StandardResponse)
+def quote_prices(
+    request: Request,
+    quote_request: QuoteRequest,
+    current_user: User = Depends(get_current_user),
+):
+    return quote_prices_service(request, quote_request, current_user)
@@ -1,9 +1,9 @@
 from fastapi import  status, Depends, APIRouter, Request
 from app.schemas.user import  UserOut, UserCreate, Login, RefreshToken, StaffCreate, StandardResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core import database
-from app.services.user import create_user_service, verify_email_service, login_user_service, logout_user_service,refresh_token_service, create_staff_service
-from app.core.security import oauth2_scheme, get_current_admin
+from app.services.user import create_user_service, verify_email_service, login_user_service, logout_user_service,refresh_token_service, create_staff_service, logout_all_service
+from app.core.security import oauth2_scheme, get_current_admin, get_current_user
 from app.models import user
 
 
@@ -13,31 +13,36 @@ router = APIRouter(
     tags=["Users"]
 )
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=UserOut)
-async def create_user(request: Request, user: UserCreate, db: Session = Depends(database.get_db)): 
+async def create_user(request: Request, user: UserCreate, db: AsyncSession = Depends(database.get_db)): 
     return await create_user_service(request, user, db)
 
 
 @router.get("/verify")
-async def verify_email(request: Request, token: str, db: Session = Depends(database.get_db)):
+async def verify_email(request: Request, token: str, db: AsyncSession = Depends(database.get_db)):
       return await verify_email_service(request, token, db)
 
 
 
 @router.post("/login", response_model=StandardResponse)
-def login(request: Request, user_credentials: Login, db:Session = Depends(database.get_db)):
-     return login_user_service(request, user_credentials, db)
+async def login(request: Request, user_credentials: Login, db: AsyncSession = Depends(database.get_db)):
+     return await login_user_service(request, user_credentials, db)
 
 
 
 @router.post("/logout")
-def logout(request: Request, token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
-    return logout_user_service(request, token, db)
+async def logout(request: Request, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(database.get_db)):
+    return await logout_user_service(request, token, db)
+
+
+@router.post("/logout-all")
+async def logout_all(request: Request, db: AsyncSession = Depends(database.get_db), current_user: user.User = Depends(get_current_user)):
+    return await logout_all_service(request, db, current_user)
 
 
 @router.post("/refresh", response_model=dict)
-def refresh_token(request: Request, refresh_token: RefreshToken, db: Session = Depends(database.get_db)):
-    return refresh_token_service(request, refresh_token, db)
+async def refresh_token(request: Request, refresh_token: RefreshToken, db: AsyncSession = Depends(database.get_db)):
+    return await refresh_token_service(request, refresh_token, db)
 
 @router.post("/staff", status_code=status.HTTP_201_CREATED, response_model=StandardResponse)
-def create_staff(request: Request, staff: StaffCreate, db: Session = Depends(database.get_db), current_admin: user.User = Depends(get_current_admin)):
-    return create_staff_service(request, staff, db, current_admin)
\ No newline at end of file
+async def create_staff(request: Request, staff: StaffCreate, db: AsyncSession = Depends(database.get_db), current_admin: user.User = Depends(get_current_admin)):
+    return await create_staff_service(request, staff, db, current_admin)
\ No newline at end of file
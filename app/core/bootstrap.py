@@ -0,0 +1,43 @@
+import logging
+
+from sqlalchemy import text
+
+from app.core import security
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+from app.services.email import preload_templates
+from app.services.logistics import warm_driver_index
+from app.core.revocation import revocation_list
+
+logger = logging.getLogger(__name__)
+
+
+async def check_postgis(db):
+    try:
+        version = (await db.execute(text("SELECT postgis_version()"))).scalar()
+    except Exception as exc:
+        raise RuntimeError("PostGIS is not available on the configured database") from exc
+    logger.info("PostGIS %s", version)
+
+
+async def warm_pool(size: int):
+    """Opens ``size`` connections up front so the first requests don't pay for
+    the TCP/auth handshake; they go back to the pool when released."""
+    connections = []
+    try:
+        for _ in range(size):
+            connections.append(await engine.connect())
+    finally:
+        for connection in connections:
+            await connection.close()
+
+
+async def bootstrap():
+    """One-time setup run before the app starts accepting traffic."""
+    async with SessionLocal() as db:
+        await check_postgis(db)
+        await security.initialize_default_admin(db)
+        await revocation_list.rebuild(db)
+        await warm_driver_index(db)
+    await warm_pool(settings.db_pool_warm_size)
+    preload_templates()
@@ -6,6 +6,21 @@ class Settings(BaseSettings):
     database_password: str
     database_name: str 
     database_username: str
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_pool_warm_size: int = 5
+    db_statement_timeout_ms: int = 30000
+    replica_database_hostname: str | None = None
+    replica_database_port: str | None = None
+    replica_max_lag_seconds: float = 5
+    replica_lag_check_seconds: float = 2
+    read_your_writes_seconds: int = 10
+    sql_slow_query_ms: float = 200
+    sql_explain_slow_queries: bool = True
+    sql_n_plus_one_threshold: int = 10
 
     email_host_user: str
     email_host_password: str
@@ -18,6 +33,17 @@ class Settings(BaseSettings):
     refresh_token_expire_days: int
  
     secret_key: str
+    bcrypt_rounds: int = 12
+    bcrypt_pool_size: int = 2
+    bcrypt_queue_limit: int = 32
+    bcrypt_start_method: str = "forkserver"
+    revocation_bloom_capacity: int = 100000
+    revocation_bloom_error_rate: float = 0.001
+    revocation_sync_seconds: int = 5
+    revocation_purge_minutes: int = 60
+    revocation_sync_overlap_seconds: int = 60
+    principal_cache_size: int = 10000
+    principal_cache_ttl_seconds: int = 30
 
     default_admin_email: str
     admin_password: str
@@ -27,7 +53,28 @@ class Settings(BaseSettings):
     base_price_per_km: float
     weight_price_per_kg:float
     demand_multiplier:float
+    pricing_distance_mode: str = "ellipsoidal"
+    quote_ttl_seconds: int = 900
+    quote_cache_size: int = 10000
+    quote_coordinate_precision: int = 4
+    quote_weight_bucket_kg: float = 0.1
+    surge_geohash_precision: int = 5
+    surge_window_seconds: int = 300
+    surge_sensitivity: float = 0.5
+    surge_max_multiplier: float = 3.0
+    surge_sync_seconds: int = 15
     gps_freshness_minutes:int
+    driver_index_cell_deg: float = 0.01
+    driver_index_prune_seconds: int = 60
+    driver_candidate_pool: int = 5
+    driver_capacity: int = 1
+    location_flush_interval_ms: int = 500
+    location_flush_max_pending: int = 500
+    dispatch_interval_seconds: int = 30
+    dispatch_batch_size: int = 500
+    assignment_deadline_minutes: int = 60
+    matching_exact_max_side: int = 2000
+    order_export_batch_size: int = 1000
 
     paystack_secret_key: str
     frontend_url: str
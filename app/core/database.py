@@ -1,21 +1,81 @@
-from sqlalchemy import create_engine 
-from sqlalchemy.orm import sessionmaker
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from .config import settings
-from app.core import security
+from app.core import metrics
+from app.core.pool import InstrumentedPool, pool_metrics
+from app.core.query_stats import instrument
+from app.core.replica import ReplicaMonitor
 
 
-SQLALCHEMY_DATABASE_URL = f'postgresql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}'
+def database_url(hostname: str, port: str) -> str:
+    return f'postgresql+asyncpg://{settings.database_username}:{settings.database_password}@{hostname}:{port}/{settings.database_name}'
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def make_engine(url: str):
+    engine = create_async_engine(
+        url,
+        poolclass=InstrumentedPool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args={"server_settings": {"statement_timeout": str(settings.db_statement_timeout_ms)}},
+    )
+    instrument(engine)
+    return engine
 
 
+SQLALCHEMY_DATABASE_URL = database_url(settings.database_hostname, settings.database_port)
 
-def get_db():
-    db = SessionLocal()
-    try:
-        security.initialize_default_admin(db)
+engine = make_engine(SQLALCHEMY_DATABASE_URL)
+
+# expire_on_commit=False: attribute access after commit must not trigger implicit IO.
+SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+metrics.register("db_pool", lambda: pool_metrics(engine))
+
+# Optional read replica; without one every read goes to the primary.
+replica_engine = None
+ReplicaSessionLocal = None
+replica_monitor = None
+if settings.replica_database_hostname:
+    replica_engine = make_engine(database_url(
+        settings.replica_database_hostname, settings.replica_database_port or settings.database_port
+    ))
+    ReplicaSessionLocal = async_sessionmaker(bind=replica_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    replica_monitor = ReplicaMonitor(replica_engine, settings.replica_max_lag_seconds, settings.replica_lag_check_seconds)
+    metrics.register("db_replica_pool", lambda: pool_metrics(replica_engine))
+    metrics.register("db_replica", replica_monitor.metrics)
+
+
+
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
+
+
+async def read_session_factory(request: Request):
+    """The replica's session factory while it is within ``replica_max_lag_seconds``
+    and the client hasn't written recently, otherwise the primary's."""
+    if replica_monitor is not None and await replica_monitor.use_replica(request):
+        return ReplicaSessionLocal
+    return SessionLocal
+
+
+async def get_read_db(request: Request, db: AsyncSession = Depends(get_db)):
+    """Session for read-only handlers, routed by ``read_session_factory``. On the
+    primary this is the request's ``get_db`` session, shared with the auth
+    dependencies, so a read request opens a second session only for the replica."""
+    session_factory = await read_session_factory(request)
+    if session_factory is SessionLocal:
+        yield db
+        return
+    async with session_factory() as replica_db:
+        yield replica_db
+
+
+async def serialize(db: AsyncSession, schema, obj):
+    """Validate ``obj`` into ``schema`` inside the session's greenlet, so lazy
+    relationships can load instead of raising ``MissingGreenlet``."""
+    return await db.run_sync(lambda _: schema.model_validate(obj, from_attributes=True))
@@ -0,0 +1,166 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache
+def _context(rounds: int) -> CryptContext:
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+def _hash(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return _context(settings.bcrypt_rounds).verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """Runs bcrypt in a dedicated process pool so it neither blocks the event
+    loop nor the anyio threadpool. At most ``max_workers + max_queue`` jobs are
+    admitted; beyond that callers get a 503 straight away instead of queueing
+    behind work they would time out on anyway.
+
+    Workers come from a ``start_method`` context (``forkserver`` by default,
+    ``spawn`` where it is unavailable) rather than forking the running server
+    with its event loop, threads and open connections. A pool broken by a dead
+    worker is replaced and the job retried once."""
+
+    def __init__(self, max_workers: int, max_queue: int, start_method: str = "forkserver"):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        if start_method not in multiprocessing.get_all_start_methods():
+            start_method = "spawn"
+        self._context = multiprocessing.get_context(start_method)
+        self._executor = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.restarts = 0
+
+    def start(self):
+        """Create the pool and launch its workers ahead of the first request."""
+        executor = self._get_executor()
+        for _ in range(self.max_workers):
+            executor.submit(int)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self._context)
+            return self._executor
+
+    def _replace_executor(self, broken: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = None
+            self.restarts += 1
+        logger.warning("Password hashing pool broke; starting a new one")
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    async def _submit(self, fn, *args):
+        for _ in range(2):
+            executor = self._get_executor()
+            try:
+                return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+            except BrokenProcessPool:
+                self._replace_executor(executor)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Server is busy, please retry shortly",
+                    headers={"Retry-After": "1"},
+                )
+            self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            return await self._submit(fn, *args)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+                self.total_ms += elapsed_ms
+                self.max_ms = max(self.max_ms, elapsed_ms)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password, settings.bcrypt_rounds)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(_verify, plain_password, hashed_password)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def metrics(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "queue_limit": self.max_queue,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+            "avg_ms": round(self.total_ms / self.completed, 3) if self.completed else 0.0,
+            "max_ms": round(self.max_ms, 3),
+        }
+
+
+password_hasher = PasswordHasher(settings.bcrypt_pool_size, settings.bcrypt_queue_limit, settings.bcrypt_start_method)
+metrics.register("password_hasher", password_hasher.metrics)
+
+
+def calibrate(target_p99_ms: float, samples: int, min_rounds: int = 10, max_rounds: int = 16) -> int:
+    """Highest bcrypt cost whose single-hash p99 on this host stays within the target."""
+    chosen = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        timings = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            _hash("calibration-password", rounds)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        print(f"rounds={rounds} p50={timings[len(timings) // 2]:.1f}ms p99={p99:.1f}ms")
+        if p99 > target_p99_ms:
+            break
+        chosen = rounds
+    return chosen
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pick a bcrypt cost that meets a p99 latency target on this host.")
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument("--samples", type=int, default=20)
+    args = parser.parse_args()
+    print(f"BCRYPT_ROUNDS={calibrate(args.target_ms, args.samples)}")
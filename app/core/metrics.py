@@ -0,0 +1,11 @@
+from typing import Callable, Dict
+
+_collectors: Dict[str, Callable[[], dict]] = {}
+
+
+def register(name: str, collector: Callable[[], dict]):
+    _collectors[name] = collector
+
+
+def snapshot() -> dict:
+    return {name: collector() for name, collector in _collectors.items()}
@@ -0,0 +1,56 @@
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long callers wait for a connection and how
+    often they give up after ``pool_timeout``. The stats survive ``recreate()``
+    (e.g. ``engine.dispose()``)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        waited_ms = (time.perf_counter() - started) * 1000
+        self.stats.checkouts += 1
+        self.stats.total_wait_ms += waited_ms
+        self.stats.max_wait_ms = max(self.stats.max_wait_ms, waited_ms)
+        return connection
+
+
+def pool_metrics(engine) -> dict:
+    pool = engine.pool
+    stats = pool.stats
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        # overflow() counts down from -pool_size until the base pool is full.
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": stats.checkouts,
+        "timeouts": stats.timeouts,
+        "avg_wait_ms": round(stats.total_wait_ms / stats.checkouts, 3) if stats.checkouts else 0.0,
+        "max_wait_ms": round(stats.max_wait_ms, 3),
+    }
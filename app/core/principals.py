@@ -0,0 +1,46 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.user import User
+
+
+class PrincipalCache:
+    """Bounded LRU of authenticated user snapshots keyed on the token subject.
+
+    Snapshots are detached copies of the ``users`` row; a hit is merged into
+    the request's session with ``load=False``, so it behaves like a loaded
+    ``User`` without a SELECT. Local writes call ``invalidate``; changes made by
+    other workers are picked up once the entry's ``ttl_seconds`` runs out."""
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self._cache = TTLCache(max_size, ttl_seconds)  # email -> snapshot
+
+    @staticmethod
+    def _snapshot(user: User) -> User:
+        snapshot = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+        make_transient_to_detached(snapshot)
+        return snapshot
+
+    async def load(self, db: AsyncSession, email: str) -> User | None:
+        snapshot = self._cache.get(email)
+        if snapshot is not None:
+            return await db.merge(snapshot, load=False)
+
+        user = (await db.execute(select(User).where(User.email == email))).scalars().first()
+        if user is not None:
+            self._cache.put(email, self._snapshot(user))
+        return user
+
+    def invalidate(self, email: str):
+        self._cache.invalidate(email)
+
+    def metrics(self) -> dict:
+        return self._cache.metrics()
+
+
+principal_cache = PrincipalCache(settings.principal_cache_size, settings.principal_cache_ttl_seconds)
+metrics.register("principal_cache", principal_cache.metrics)
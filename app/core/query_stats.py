@@ -0,0 +1,126 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes = Counter()  # bound statement text -> executions
+
+    def record(self, statement: str, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.shapes[statement] += 1
+
+    def repeated(self, threshold: int) -> list:
+        """Statement shapes run more than ``threshold`` times: likely N+1 loads."""
+        return [(statement, count) for statement, count in self.shapes.most_common() if count > threshold]
+
+
+# Stats of the request being served; None outside requests (background loops).
+current_stats: ContextVar[QueryStats | None] = ContextVar("current_query_stats", default=None)
+
+
+def _explain(connection, statement: str, parameters) -> str:
+    # A fresh DBAPI cursor, so the original cursor's result set is untouched.
+    # It runs in the caller's transaction, so it is wrapped in a savepoint: on
+    # PostgreSQL a failed statement aborts the transaction, and every later
+    # statement of the request would fail with it.
+    dbapi_connection = connection.connection
+    savepoint = not getattr(dbapi_connection, "autocommit", False)
+    cursor = dbapi_connection.cursor()
+    try:
+        if savepoint:
+            cursor.execute("SAVEPOINT query_stats_explain")
+        try:
+            cursor.execute(f"EXPLAIN {statement}", parameters)
+            return "\n".join(str(row[0]) for row in cursor.fetchall())
+        except Exception:
+            if savepoint:
+                cursor.execute("ROLLBACK TO SAVEPOINT query_stats_explain")
+            raise
+        finally:
+            if savepoint:
+                cursor.execute("RELEASE SAVEPOINT query_stats_explain")
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    connection.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - connection.info["query_started"].pop()) * 1000
+    stats = current_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed_ms)
+    if elapsed_ms < settings.sql_slow_query_ms or statement.startswith("EXPLAIN"):
+        return
+    plan = None
+    if settings.sql_explain_slow_queries and not executemany:
+        try:
+            plan = _explain(connection, statement, parameters)
+        except Exception:
+            logger.exception("EXPLAIN of slow statement failed")
+    logger.warning(json.dumps({
+        "event": "slow_query",
+        "elapsed_ms": round(elapsed_ms, 3),
+        "statement": statement,
+        "plan": plan,
+    }))
+
+
+def instrument(engine):
+    """Attach the per-request counters and slow statement logging to an engine."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware(BaseHTTPMiddleware):
+    """Counts the statements each request runs and the time spent in them,
+    reports both in ``X-DB-Queries``/``X-DB-Time-Ms`` and a structured log
+    line, and warns when one statement shape repeats past the N+1 threshold."""
+
+    async def dispatch(self, request, call_next):
+        stats = QueryStats()
+        token = current_stats.set(stats)
+        try:
+            response = await call_next(request)
+        finally:
+            current_stats.reset(token)
+        repeated = stats.repeated(settings.sql_n_plus_one_threshold)
+        response.headers["X-DB-Queries"] = str(stats.count)
+        response.headers["X-DB-Time-Ms"] = f"{stats.total_ms:.3f}"
+        if repeated:
+            response.headers["X-DB-N-Plus-One"] = str(len(repeated))
+            for statement, count in repeated:
+                logger.warning(json.dumps({
+                    "event": "n_plus_one",
+                    "method": request.method,
+                    "path": request.url.path,
+                    "executions": count,
+                    "statement": statement,
+                }))
+        logger.info(json.dumps({
+            "event": "request_sql",
+            "request_id": str(getattr(request.state, "request_id", "")),
+            "method": request.method,
+            "path": request.url.path,
+            "status": response.status_code,
+            "queries": stats.count,
+            "db_ms": round(stats.total_ms, 3),
+        }))
+        return response
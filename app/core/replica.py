@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import time
+
+from sqlalchemy import text
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Epoch second until which a client that wrote keeps reading from the primary.
+READ_YOUR_WRITES_COOKIE = "read_primary_until"
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# NULL (unusable) unless the replica is streaming from the primary: a replica
+# that lost its upstream has replayed everything it received and would read as
+# caught up forever. While streaming, zero when everything received has been
+# replayed (an idle primary sends nothing), otherwise the age of the last
+# replayed transaction.
+REPLICA_LAG_SQL = text(
+    "SELECT CASE "
+    "WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN NULL "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def wrote_recently(request) -> bool:
+    try:
+        return float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReplicaMonitor:
+    """Decides per request whether a read can go to the replica. Lag is
+    measured at most every ``check_seconds``; a failed check counts as
+    unusable until the next one."""
+
+    def __init__(self, engine, max_lag_seconds: float, check_seconds: float):
+        self.engine = engine
+        self.max_lag = max_lag_seconds
+        self.check_seconds = check_seconds
+        self.lag_seconds = None
+        self._checked_at = None
+        self._lock = asyncio.Lock()
+        self.replica_reads = 0
+        self.sticky_reads = 0
+        self.lag_fallbacks = 0
+        self.check_errors = 0
+
+    def _stale(self) -> bool:
+        return self._checked_at is None or time.monotonic() - self._checked_at >= self.check_seconds
+
+    async def _measure(self) -> float | None:
+        async with self.engine.connect() as connection:
+            lag = (await connection.execute(REPLICA_LAG_SQL)).scalar()
+        if lag is None:
+            logger.warning("Replica is not streaming from the primary")
+        return None if lag is None else float(lag)
+
+    async def usable(self) -> bool:
+        if self._stale():
+            async with self._lock:
+                if self._stale():
+                    try:
+                        self.lag_seconds = await self._measure()
+                    except Exception:
+                        logger.exception("Replica lag check failed")
+                        self.check_errors += 1
+                        self.lag_seconds = None
+                    self._checked_at = time.monotonic()
+        return self.lag_seconds is not None and self.lag_seconds <= self.max_lag
+
+    async def use_replica(self, request) -> bool:
+        if wrote_recently(request):
+            self.sticky_reads += 1
+            return False
+        if not await self.usable():
+            self.lag_fallbacks += 1
+            return False
+        self.replica_reads += 1
+        return True
+
+    def metrics(self) -> dict:
+        return {
+            "lag_seconds": self.lag_seconds,
+            "max_lag_seconds": self.max_lag,
+            "replica_reads": self.replica_reads,
+            "sticky_reads": self.sticky_reads,
+            "lag_fallbacks": self.lag_fallbacks,
+            "check_errors": self.check_errors,
+        }
+
+
+class ReadYourWritesMiddleware(BaseHTTPMiddleware):
+    """Pins a client to the primary for ``read_your_writes_seconds`` after any
+    successful write, so it never reads back a state older than its own."""
+
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        if request.method in WRITE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                READ_YOUR_WRITES_COOKIE,
+                str(int(time.time()) + settings.read_your_writes_seconds),
+                max_age=settings.read_your_writes_seconds,
+                httponly=True,
+                samesite="lax",
+            )
+        return response
@@ -0,0 +1,196 @@
+import asyncio
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.config import settings
+from app.models.user import TokenBlackList
+
+logger = logging.getLogger(__name__)
+
+
+def _db_utcnow():
+    # Naive UTC, like the utcnow() values in the table, from the database clock
+    # so the sync window does not depend on clock skew between workers.
+    return func.timezone("utc", func.now())
+
+
+def revocation_key(token: str, claims: dict) -> str:
+    """The token's ``jti``, or the SHA-256 hex digest of tokens issued without one."""
+    return claims.get("jti") or hashlib.sha256(token.encode()).hexdigest()
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        # Double hashing over two independent halves of a SHA-256 of the key.
+        digest = hashlib.sha256(key.encode()).digest()
+        h1, h2 = int.from_bytes(digest[:8], "big"), int.from_bytes(digest[8:16], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationList:
+    """Revoked tokens, stored by ``jti`` (or digest) in ``token_blacklist``.
+
+    A Bloom filter answers "definitely not revoked" without touching the
+    database; only its positives consult a TTL cache and then the table. The
+    filter is rebuilt from the table at startup and after each purge, and new
+    rows written by other workers are picked up every ``sync_seconds``, so a
+    revocation reaches every worker within that interval.
+
+    Sync reads rows by ``blacklisted_at`` (the database clock) since the last
+    sync minus ``overlap_seconds``: serial ids are not committed in order, so a
+    high-water id would skip rows whose transaction committed late."""
+
+    def __init__(self, capacity: int, error_rate: float, sync_seconds: int, purge_minutes: int, overlap_seconds: int):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_seconds = sync_seconds
+        self.purge_seconds = purge_minutes * 60
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._revoked = {}  # key -> expires_at
+        self._synced_at = None  # database time the last sync or rebuild started
+        self._last_purge = time.monotonic()
+        self.checks = 0
+        self.bloom_negatives = 0
+        self.cache_hits = 0
+        self.db_lookups = 0
+        self.purged = 0
+
+    def _remember(self, key: str, expires_at: datetime | None):
+        self._bloom.add(key)
+        if expires_at is None or expires_at > datetime.utcnow():
+            self._revoked[key] = expires_at
+
+    async def is_revoked(self, db: AsyncSession, key: str) -> bool:
+        self.checks += 1
+        if key not in self._bloom:
+            self.bloom_negatives += 1
+            return False
+        if key in self._revoked:
+            expires_at = self._revoked[key]
+            if expires_at is None or expires_at > datetime.utcnow():
+                self.cache_hits += 1
+                return True
+            self._revoked.pop(key, None)
+        self.db_lookups += 1
+        row = (await db.execute(select(TokenBlackList.expires_at).where(TokenBlackList.token == key))).first()
+        if row is None:
+            return False
+        with self._lock:
+            self._remember(key, row.expires_at)
+        return True
+
+    async def revoke(self, db: AsyncSession, key: str, expires_at: datetime | None):
+        # Idempotent, so concurrent logouts of the same token both succeed.
+        await db.execute(
+            insert(TokenBlackList)
+            .values(token=key, expires_at=expires_at, blacklisted_at=_db_utcnow())
+            .on_conflict_do_nothing(index_elements=[TokenBlackList.token])
+        )
+        await db.commit()
+        with self._lock:
+            self._remember(key, expires_at)
+
+    async def rebuild(self, db: AsyncSession):
+        started_at = (await db.execute(select(_db_utcnow()))).scalar()
+        rows = (await db.execute(
+            select(TokenBlackList.token, TokenBlackList.expires_at)
+            .where((TokenBlackList.expires_at == None) | (TokenBlackList.expires_at > datetime.utcnow()))
+        )).all()
+        bloom = BloomFilter(max(self.capacity, 2 * len(rows)), self.error_rate)
+        revoked = {}
+        for key, expires_at in rows:
+            bloom.add(key)
+            revoked[key] = expires_at
+        with self._lock:
+            self._bloom, self._revoked = bloom, revoked
+            self._synced_at = started_at
+
+    async def sync(self, db: AsyncSession):
+        if self._synced_at is None:
+            await self.rebuild(db)
+            return
+        started_at = (await db.execute(select(_db_utcnow()))).scalar()
+        # Rows already seen in the overlap are re-applied; _remember is idempotent.
+        rows = (await db.execute(
+            select(TokenBlackList.token, TokenBlackList.expires_at)
+            .where(TokenBlackList.blacklisted_at >= self._synced_at - self.overlap)
+        )).all()
+        with self._lock:
+            for key, expires_at in rows:
+                self._remember(key, expires_at)
+            self._synced_at = started_at
+
+    async def purge(self, db: AsyncSession) -> int:
+        now = datetime.utcnow()
+        # Legacy rows without an expiry outlive any token after the refresh lifetime.
+        legacy_cutoff = now - timedelta(days=settings.refresh_token_expire_days)
+        deleted = (await db.execute(
+            delete(TokenBlackList)
+            .where(
+                (TokenBlackList.expires_at < now)
+                | ((TokenBlackList.expires_at == None) & (TokenBlackList.blacklisted_at < legacy_cutoff))
+            )
+            .execution_options(synchronize_session=False)
+        )).rowcount
+        await db.commit()
+        self.purged += deleted
+        await self.rebuild(db)
+        return deleted
+
+    async def tick(self, session_factory):
+        async with session_factory() as db:
+            await self.sync(db)
+            if time.monotonic() - self._last_purge >= self.purge_seconds:
+                self._last_purge = time.monotonic()
+                await self.purge(db)
+
+    async def run(self, session_factory):
+        while True:
+            await asyncio.sleep(self.sync_seconds)
+            try:
+                await self.tick(session_factory)
+            except Exception:
+                logger.exception("Token revocation sync failed")
+
+    def metrics(self) -> dict:
+        return {
+            "cached": len(self._revoked),
+            "checks": self.checks,
+            "bloom_negatives": self.bloom_negatives,
+            "cache_hits": self.cache_hits,
+            "db_lookups": self.db_lookups,
+            "purged": self.purged,
+        }
+
+
+revocation_list = RevocationList(
+    settings.revocation_bloom_capacity,
+    settings.revocation_bloom_error_rate,
+    settings.revocation_sync_seconds,
+    settings.revocation_purge_minutes,
+    settings.revocation_sync_overlap_seconds,
+)
+metrics.register("token_revocation", revocation_list.metrics)
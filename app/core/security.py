@@ -1,23 +1,26 @@
-from passlib.context import CryptContext
 from jose import jwt
 from datetime import datetime, timedelta
 from app.core.config import settings
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends, HTTPException, status
-from app.models.user import TokenBlackList, User
+from app.models.user import User
+from app.core.revocation import revocation_key, revocation_list
+from uuid import uuid4
+from app.core.principals import principal_cache
+from app.core.hashing import password_hasher
 from jose import jwt, JWTError
 from app.core import database
 from fastapi.security import OAuth2PasswordBearer
 from app.schemas.user import UserRole
-pwd_context = CryptContext(schemes=["bcrypt"],
-deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/login")
 
-def hash(password: str):
-    return pwd_context.hash(password)
+async def hash_password(password: str) -> str:
+    return await password_hasher.hash(password)
 
-def verify(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
 
 
 def create_email_token(email: str) -> str:
@@ -25,29 +28,48 @@ def create_email_token(email: str) -> str:
     to_encode = {"sub": email, "exp": expire}
     return jwt.encode(to_encode, settings.secret_key, algorithm="HS256")
 
-def create_access_token(data: dict) -> str:
+def create_access_token(data: dict, token_version: int = 0) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
-    to_encode.update({"exp": expire, "type": "access"})
+    to_encode.update({"exp": expire, "type": "access", "jti": uuid4().hex, "ver": token_version})
     return jwt.encode(to_encode, settings.secret_key, algorithm="HS256")
 
-def create_refresh_token(data: dict) -> str:
+def create_refresh_token(data: dict, token_version: int = 0) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=settings.refresh_token_expire_days)
-    to_encode.update({"exp": expire, "type": "refresh"})
+    to_encode.update({"exp": expire, "type": "refresh", "jti": uuid4().hex, "ver": token_version})
     return jwt.encode(to_encode, settings.secret_key, algorithm="HS256")
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(lambda: next(__import__("app.core.database").core.database.get_db()))) -> User:
+def create_quote_token(data: dict) -> str:
+    to_encode = data.copy()
+    expire = datetime.utcnow() + timedelta(seconds=settings.quote_ttl_seconds)
+    to_encode.update({"exp": expire, "type": "quote"})
+    return jwt.encode(to_encode, settings.secret_key, algorithm="HS256")
+
+def decode_quote_token(token: str) -> dict | None:
+    try:
+        payload = jwt.decode(token, settings.secret_key, algorithms=["HS256"])
+    except JWTError:
+        return None
+    if payload.get("type") != "quote":
+        return None
+    return payload
+
+
+async def is_token_revoked(db: AsyncSession, token: str, payload: dict) -> bool:
+    # Logout revokes the login session id shared by the access and refresh tokens.
+    if await revocation_list.is_revoked(db, revocation_key(token, payload)):
+        return True
+    return bool(payload.get("sid")) and await revocation_list.is_revoked(db, payload["sid"])
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(database.get_db)) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    # Check if token is blacklisted
-    if db.query(TokenBlackList).filter(TokenBlackList.token == token).first():
-        raise credentials_exception
      
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=["HS256"])
@@ -57,23 +79,25 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+
+    if await is_token_revoked(db, token, payload):
+        raise credentials_exception
     
-    user = db.query(User).filter(User.email == email).first()
+    user = await principal_cache.load(db, email)
     if user is None:
         raise credentials_exception
+    # Bumping users.token_version logs every session of the user out.
+    if payload.get("ver", 0) != user.token_version:
+        raise credentials_exception
     return user
 
 
-def refresh_access_token(refresh_token: str, db: Session) -> dict:
+async def refresh_access_token(refresh_token: str, db: AsyncSession) -> dict:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Invalid refresh token",
     )
     
-    # Check if refresh token is blacklisted
-    if db.query(TokenBlackList).filter(TokenBlackList.token == refresh_token).first():
-        raise credentials_exception
-    
     try:
         payload = jwt.decode(refresh_token, settings.secret_key, algorithms=["HS256"])
         email: str = payload.get("sub")
@@ -82,35 +106,43 @@ def refresh_access_token(refresh_token: str, db: Session) -> dict:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+
+    if await is_token_revoked(db, refresh_token, payload):
+        raise credentials_exception
     
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
+    user = await principal_cache.load(db, email)
+    if user is None or payload.get("ver", 0) != user.token_version:
         raise credentials_exception
     
-    access_token = create_access_token({"sub": email})
+    claims = {"sub": email, "sid": payload["sid"]} if payload.get("sid") else {"sub": email}
+    access_token = create_access_token(claims, user.token_version)
     return {"access_token": access_token, "token_type": "bearer"}
 
 
-def initialize_default_admin(db: Session):
+async def initialize_default_admin(db: AsyncSession):
     admin_email = settings.default_admin_email
-    if not db.query(User).filter(User.email == admin_email).first():
-        admin = User(
-            email=admin_email,
-            first_name ="Admin",
-            last_name = "Admin",
-            password=hash(settings.admin_password),
-            is_verified=True,
-            role=UserRole.ADMIN,
-            staff_id="ADM001"
+    if not (await db.execute(select(User.id).where(User.email == admin_email))).first():
+        # Workers boot concurrently on a fresh database; whichever inserts
+        # second hits the unique email/staff_id and skips instead of failing.
+        await db.execute(
+            insert(User)
+            .values(
+                email=admin_email,
+                first_name ="Admin",
+                last_name = "Admin",
+                password=await hash_password(settings.admin_password),
+                is_verified=True,
+                role=UserRole.ADMIN,
+                staff_id="ADM001"
+            )
+            .on_conflict_do_nothing()
         )
-        db.add(admin)
-        db.commit()
-        db.refresh(admin)
+        await db.commit()
     return None
 
 def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
     if current_user.role != UserRole.ADMIN:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, details="Admin access requried")
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
     return current_user
 
 
@@ -1,9 +1,41 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.api import user, order, payment
+from app.api import user, order, payment, metrics
 from fastapi.middleware.cors import CORSMiddleware
 from app.services.response import RequestIDMiddleware
-app = FastAPI(
-)
+from app.core.bootstrap import bootstrap
+from app.core.database import SessionLocal, replica_monitor
+from app.core.replica import ReadYourWritesMiddleware
+from app.core.query_stats import QueryStatsMiddleware
+from app.services.location_sink import location_sink
+from app.services.dispatch import dispatch_scheduler
+from app.services.surge import surge_engine
+from app.core.revocation import revocation_list
+from app.core.hashing import password_hasher
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await bootstrap()
+    password_hasher.start()
+    tasks = [
+        asyncio.create_task(revocation_list.run(SessionLocal)),
+        asyncio.create_task(location_sink.run()),
+        asyncio.create_task(dispatch_scheduler.run()),
+        asyncio.create_task(surge_engine.run(SessionLocal)),
+    ]
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await location_sink.flush()
+        password_hasher.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = ["*"]
 app.add_middleware(
@@ -14,14 +46,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(QueryStatsMiddleware)
 app.add_middleware(RequestIDMiddleware)
+if replica_monitor is not None:
+    app.add_middleware(ReadYourWritesMiddleware)
 
 
 app.include_router(user.router)
 app.include_router(order.router)
 app.include_router(payment.router)
+app.include_router(metrics.router)
+
 
 @app.get("/")
 def root():
     return {"message": "Hello World pushing out to ubuntu"}
-
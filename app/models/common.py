@@ -1,6 +1,18 @@
 from sqlalchemy import Column, DateTime 
+from sqlalchemy.types import UserDefinedType
 from datetime import datetime
 
 class Audit:
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_up = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
\ No newline at end of file
+    updated_up = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class Geography(UserDefinedType):
+    cache_ok = True
+
+    def __init__(self, geometry_type: str = "Point", srid: int = 4326):
+        self.geometry_type = geometry_type
+        self.srid = srid
+
+    def get_col_spec(self, **kw):
+        return f"geography({self.geometry_type},{self.srid})"
@@ -1,11 +1,11 @@
-from sqlalchemy import Column, Integer, String, Float, Enum, ForeignKey, JSON, DateTime, func, Boolean
+from sqlalchemy import Column, Integer, String, Float, Enum, ForeignKey, JSON, DateTime, func, Boolean, Index
 import enum
 from app.core.base import Base
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import JSONB
-from app.models.common import Audit
+from app.models.common import Audit, Geography
 from uuid import uuid4
 
 
@@ -41,12 +41,18 @@ class Order(Base, Audit):
     status_history = relationship("OrderStatusHistory", back_populates="order")
     proof_of_delivery = relationship("ProofOfDelivery", uselist=False, back_populates="order")
 
+    __table_args__ = (
+        Index("ix_orders_customer_id_created_at", "customer_id", "created_at"),
+        Index("ix_orders_driver_id_status", "driver_id", "status"),
+        Index("ix_orders_status_created_at", "status", "created_at"),
+    )
+
 class OrderStatusHistory(Base, Audit):
     __tablename__ = "order_status_history"
     id = Column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid4)
     order_id= Column(UUID(as_uuid=True), ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
     status = Column(Enum(OrderStatus), nullable=False)
-    changed_by_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    changed_by_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)  # null for system transitions
     timestamp = Column(DateTime, default=func.now())
     order = relationship("Order", back_populates="status_history")
     changed_by = relationship("User")
@@ -67,4 +73,9 @@ class DriverLocation(Base, Audit):
     id = Column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
     driver_id=Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, unique=True)
     location=Column(JSONB, nullable=False)
+    position = Column(Geography("Point", 4326), nullable=True)
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_driver_locations_position", "position", postgresql_using="gist"),
+    )
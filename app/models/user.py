@@ -1,5 +1,5 @@
 from app.core.base import Base
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, Index
 from datetime import datetime
 from sqlalchemy.dialects.postgresql import UUID
 from .common import Audit
@@ -22,11 +22,18 @@ class User(Base, Audit):
     is_verified = Column(Boolean, default=False)
     role = Column(Enum(UserRole), default=UserRole.CUSTOMER, nullable=False)
     staff_id = Column(String, unique=True, nullable=True) # e.g STF001
+    active_orders = Column(Integer, nullable=False, default=0, server_default="0") # ASSIGNED + PICKED_UP orders held as driver
+    token_version = Column(Integer, nullable=False, default=0, server_default="0") # tokens carrying an older "ver" are rejected
     payments = relationship("Payment", back_populates="customer")
+
+    __table_args__ = (
+        Index("ix_users_role_active_orders", "role", "active_orders"),
+    )
     
     
 class TokenBlackList(Base, Audit):
     __tablename__ = "token_blacklist"
     id = Column(Integer, primary_key=True, index=True)
-    token = Column(String, unique=True, index=True, nullable=False)
-    blacklisted_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    token = Column(String, unique=True, index=True, nullable=False) # token jti, or sha256 hex digest for tokens without one
+    blacklisted_at = Column(DateTime, default=datetime.utcnow, index=True) # database time of revocation; drives cross-worker sync
+    expires_at = Column(DateTime, nullable=True, index=True) # token exp; row can be purged after this
\ No newline at end of file
@@ -18,6 +18,14 @@ class GeoPoint(BaseModel):
     type: str = Field("Point", Literal=True)
     coordinates: List[float]
 
+class LocationPing(BaseModel):
+    driver_id: Optional[UUID] = None  # required when a gateway reports for many drivers
+    location: GeoPoint
+    recorded_at: datetime
+
+class LocationBatch(BaseModel):
+    points: List[LocationPing] = Field(..., min_length=1, max_length=5000)
+
 class PackageDetails(BaseModel):
     weight_kg:float
     dimensions_cm: list[float] = Field(..., min_items=1)
@@ -32,6 +40,7 @@ class OrderCreate(BaseModel):
     delivery_location: GeoPoint
     package_details: PackageDetails
     recipient_details: RecipientDetails
+    quote_token: Optional[str] = None  # from POST /payment/quotes
 
 class OrderOut(BaseModel):
     id: UUID
@@ -50,20 +59,27 @@ class OrderOut(BaseModel):
     class Config:
         from_attributes = True
 
+class OrderPage(BaseModel):
+    items: List[OrderOut]
+    next_cursor: Optional[str]  # pass back as ?cursor= for the next page
+
+class OrderStatusUpdate(BaseModel):
+    status: OrderStatus
+
 class OrderStatusHistoryOut(BaseModel):
-    id: int
+    id: UUID
     status: OrderStatus
-    changed_by: UserOut
+    changed_by: Optional[UserOut]
     timestamp: datetime
 
     class Config:
         from_attributes = True 
 
 class ProofOfDeliveryOut(BaseModel):
-    id: int
+    id: UUID
     image_path: Optional[str]
     signature_path: Optional[str]
-    uploaded_at: datetime
+    uploaded_at: datetime = Field(validation_alias="uploaded_path")  # the column holds the upload time
 
     class Config:
         from_attributes = True
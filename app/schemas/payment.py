@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from uuid import UUID
-from typing import Dict, Optional
+from typing import Dict, List, Literal, Optional
+from .order import GeoPoint
 
 class PaymentInitialize(BaseModel):
     email: str
@@ -16,4 +17,18 @@ class PaymentOut(BaseModel):
     customer_id: UUID
     order_id: Optional[UUID] 
     class Config:
-       from_attributes = True
\ No newline at end of file
+       from_attributes = True
+
+class QuoteCandidate(BaseModel):
+    pickup_location: GeoPoint
+    delivery_location: GeoPoint
+    weight_kg: float = Field(..., ge=0)
+
+class QuoteRequest(BaseModel):
+    candidates: List[QuoteCandidate] = Field(..., min_length=1, max_length=1000)
+    mode: Optional[Literal["haversine", "ellipsoidal"]] = None
+
+class QuoteOut(BaseModel):
+    distance_km: float
+    price: float
+    quote_token: str
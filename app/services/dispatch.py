@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.order import Order, OrderStatus
+from app.services.geo import haversine_matrix
+from app.services.logistics import fresh_driver_positions
+from app.services.matching import solve_assignment
+from app.services.transitions import claim_order, transition_order
+from app.services.surge import surge_engine
+
+logger = logging.getLogger(__name__)
+
+# pg advisory lock key so only one worker runs a dispatch tick at a time.
+DISPATCH_LOCK_KEY = 0x6469737061746368
+
+
+class DispatchScheduler:
+    """Periodically matches every paid order still in CREATED against the
+    available drivers as one min-cost assignment, and fails orders nobody
+    picked up before the assignment deadline. All state lives in the orders
+    table, so a restart simply resumes on the next tick."""
+
+    def __init__(self, interval_seconds: int, deadline_minutes: int, batch_size: int):
+        self.interval = interval_seconds
+        self.deadline = timedelta(minutes=deadline_minutes)
+        self.batch_size = batch_size
+        self.ticks = 0
+        self.skipped_ticks = 0
+        self.assigned = 0
+        self.failed = 0
+        self.last_tick_ms = 0.0
+
+    async def match(self, db: AsyncSession, orders) -> list:
+        """Ids of the orders claimed; the caller commits."""
+        orders = [db_order for db_order in orders if len(db_order.pickup_location.get("coordinates", [])) == 2]
+        # One column per free slot, so a driver with spare capacity can take several orders.
+        drivers = [
+            (driver_id, longitude, latitude)
+            for driver_id, longitude, latitude, free_slots in await fresh_driver_positions(db)
+            for _ in range(free_slots)
+        ]
+        if not orders or not drivers:
+            return []
+        cost = haversine_matrix(
+            np.array([db_order.pickup_location["coordinates"] for db_order in orders]),
+            np.array([(longitude, latitude) for _, longitude, latitude in drivers]),
+        )
+        assigned = []
+        # The solver is CPU-bound; keep it off the event loop.
+        for row, col in await run_in_threadpool(solve_assignment, cost):
+            driver_id = drivers[col][0]
+            # changed_by_id None: a system transition, like the deadline failures.
+            if await claim_order(db, orders[row].id, driver_id, None):
+                assigned.append(orders[row].id)
+        return assigned
+
+    async def tick(self):
+        started = time.perf_counter()
+        try:
+            async with SessionLocal() as db:
+                await self._tick(db)
+        finally:
+            self.last_tick_ms = (time.perf_counter() - started) * 1000
+
+    async def _tick(self, db: AsyncSession):
+        if not (await db.execute(select(func.pg_try_advisory_xact_lock(DISPATCH_LOCK_KEY)))).scalar():
+            self.skipped_ticks += 1
+            return
+        pending = (await db.execute(
+            select(Order)
+            .where(Order.status == OrderStatus.CREATED, Order.is_verified == True)
+            .order_by(Order.created_at)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )).scalars().all()
+        # updated_up is last touched when the payment was verified.
+        deadline = datetime.utcnow() - self.deadline
+        expired = [db_order for db_order in pending if db_order.updated_up < deadline]
+        for db_order in expired:
+            await transition_order(db, db_order.id, [OrderStatus.CREATED], OrderStatus.FAILED, None)
+        assigned = await self.match(db, [db_order for db_order in pending if db_order.updated_up >= deadline])
+        await db.commit()
+        for order_id in assigned + [db_order.id for db_order in expired]:
+            surge_engine.order_closed(order_id)
+        self.ticks += 1
+        self.assigned += len(assigned)
+        self.failed += len(expired)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.tick()
+            except Exception:
+                logger.exception("Dispatch tick failed")
+
+    def metrics(self) -> dict:
+        return {
+            "ticks": self.ticks,
+            "skipped_ticks": self.skipped_ticks,
+            "assigned": self.assigned,
+            "failed": self.failed,
+            "last_tick_ms": round(self.last_tick_ms, 3),
+        }
+
+
+dispatch_scheduler = DispatchScheduler(
+    settings.dispatch_interval_seconds,
+    settings.assignment_deadline_minutes,
+    settings.dispatch_batch_size,
+)
+metrics.register("dispatch", dispatch_scheduler.metrics)
@@ -0,0 +1,131 @@
+import heapq
+import math
+import threading
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from app.core.config import settings
+from app.services.geo import KM_PER_DEGREE, haversine_km
+
+
+class DriverSpatialIndex:
+    """Grid index of the last known position of every driver that pinged
+    within ``gps_freshness_minutes``. Stale entries are skipped on lookup and
+    dropped lazily, or in bulk by ``prune``."""
+
+    def __init__(self, cell_size_deg: float):
+        self.cell_size = cell_size_deg
+        self._lock = threading.Lock()
+        self._positions = {}  # driver_id -> (lon, lat, seen_at, cell)
+        self._cells = {}  # cell -> set of driver_ids
+
+    def __len__(self):
+        return len(self._positions)
+
+    def _cell(self, lon: float, lat: float) -> Tuple[int, int]:
+        return math.floor(lon / self.cell_size), math.floor(lat / self.cell_size)
+
+    @staticmethod
+    def _freshness_threshold() -> datetime:
+        return datetime.utcnow() - timedelta(minutes=settings.gps_freshness_minutes)
+
+    def _discard(self, driver_id: UUID):
+        entry = self._positions.pop(driver_id, None)
+        if entry is None:
+            return
+        members = self._cells.get(entry[3])
+        if members is not None:
+            members.discard(driver_id)
+            if not members:
+                del self._cells[entry[3]]
+
+    def upsert(self, driver_id: UUID, lon: float, lat: float, seen_at: Optional[datetime] = None):
+        seen_at = seen_at or datetime.utcnow()
+        cell = self._cell(lon, lat)
+        with self._lock:
+            current = self._positions.get(driver_id)
+            if current is not None and current[2] > seen_at:
+                return
+            self._discard(driver_id)
+            self._positions[driver_id] = (lon, lat, seen_at, cell)
+            self._cells.setdefault(cell, set()).add(driver_id)
+
+    def seen_at(self, driver_id: UUID) -> Optional[datetime]:
+        """When the indexed position of ``driver_id`` was recorded, or None."""
+        entry = self._positions.get(driver_id)
+        return entry[2] if entry is not None else None
+
+    def remove(self, driver_id: UUID):
+        with self._lock:
+            self._discard(driver_id)
+
+    def prune(self) -> int:
+        threshold = self._freshness_threshold()
+        with self._lock:
+            stale = [driver_id for driver_id, entry in self._positions.items() if entry[2] < threshold]
+            for driver_id in stale:
+                self._discard(driver_id)
+        return len(stale)
+
+    def _ring(self, cx: int, cy: int, radius: int) -> Iterable[Tuple[int, int]]:
+        if radius == 0:
+            yield cx, cy
+            return
+        for dx in range(-radius, radius + 1):
+            yield cx + dx, cy - radius
+            yield cx + dx, cy + radius
+        for dy in range(-radius + 1, radius):
+            yield cx - radius, cy + dy
+            yield cx + radius, cy + dy
+
+    def _ring_min_km(self, lat: float, radius: int) -> float:
+        # Anything outside the rings searched so far is at least ``radius``
+        # whole cells away; longitude cells shrink towards the poles.
+        widest_lat = min(90.0, abs(lat) + (radius + 1) * self.cell_size)
+        return radius * self.cell_size * KM_PER_DEGREE * math.cos(math.radians(widest_lat))
+
+    def nearest(self, lon: float, lat: float, k: int = 1, exclude: Iterable[UUID] = ()) -> List[Tuple[UUID, float]]:
+        """Return up to ``k`` fresh drivers as ``(driver_id, distance_km)``, closest first."""
+        threshold = self._freshness_threshold()
+        exclude = set(exclude)
+        best = []  # max-heap of (-distance_km, driver_id)
+        stale = []
+
+        def consider(driver_id):
+            if driver_id in exclude:
+                return
+            d_lon, d_lat, seen_at, _ = self._positions[driver_id]
+            if seen_at < threshold:
+                stale.append(driver_id)
+                return
+            distance = haversine_km(lon, lat, d_lon, d_lat)
+            if len(best) < k:
+                heapq.heappush(best, (-distance, driver_id))
+            elif distance < -best[0][0]:
+                heapq.heapreplace(best, (-distance, driver_id))
+
+        with self._lock:
+            cx, cy = self._cell(lon, lat)
+            radius = 0
+            while self._cells:
+                if (2 * radius + 1) ** 2 > 4 * len(self._cells):
+                    # The search square now dwarfs the occupied area, a flat scan is cheaper.
+                    best.clear()
+                    stale.clear()
+                    for driver_id in list(self._positions):
+                        consider(driver_id)
+                    break
+                for cell in self._ring(cx, cy, radius):
+                    for driver_id in self._cells.get(cell, ()):
+                        consider(driver_id)
+                if len(best) >= k and -best[0][0] <= self._ring_min_km(lat, radius):
+                    break
+                radius += 1
+            for driver_id in stale:
+                self._discard(driver_id)
+
+        return [(driver_id, -neg_distance) for neg_distance, driver_id in sorted(best, reverse=True)]
+
+
+driver_index = DriverSpatialIndex(settings.driver_index_cell_deg)
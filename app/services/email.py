@@ -11,6 +11,12 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, "..", "templates")
 env = Environment(loader=FileSystemLoader(TEMPLATES_DIR))
 
 
+def preload_templates():
+    # Compiled templates are kept in the environment's cache.
+    for name in env.list_templates():
+        env.get_template(name)
+
+
 conf =  ConnectionConfig(
     MAIL_USERNAME=settings.email_host_user,
     MAIL_PASSWORD=settings.email_host_password,
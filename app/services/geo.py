@@ -0,0 +1,80 @@
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash(lon: float, lat: float, precision: int) -> str:
+    lon_range, lat_range = [-180.0, 180.0], [-90.0, 90.0]
+    cell, bits, bit_count, even = [], 0, 0, True
+    while len(cell) < precision:
+        value, bounds = (lon, lon_range) if even else (lat, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        if value >= mid:
+            bits = bits * 2 + 1
+            bounds[0] = mid
+        else:
+            bits = bits * 2
+            bounds[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            cell.append(GEOHASH_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(cell)
+
+
+def haversine_km(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_matrix(origins: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """Pairwise great-circle distances in km between ``(n, 2)`` and ``(m, 2)``
+    arrays of ``[longitude, latitude]``."""
+    origins = np.radians(np.asarray(origins, dtype=float))
+    targets = np.radians(np.asarray(targets, dtype=float))
+    lon1, lat1 = origins[:, 0:1], origins[:, 1:2]
+    lon2, lat2 = targets[:, 0][None, :], targets[:, 1][None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+WGS84_A_KM = 6378.137
+WGS84_F = 1 / 298.257223563
+
+
+def haversine_km_array(lon1, lat1, lon2, lat2) -> np.ndarray:
+    """Element-wise haversine on a sphere of the mean Earth radius. Against the
+    WGS84 geodesic the relative error stays within about 0.6%."""
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    d_lambda = np.radians(np.asarray(lon2) - np.asarray(lon1))
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def lambert_km_array(lon1, lat1, lon2, lat2) -> np.ndarray:
+    """Element-wise Lambert's formula on the WGS84 ellipsoid: a closed-form
+    correction of the great-circle angle between reduced latitudes. Against
+    the iterative (Karney) geodesic the error is under 1 m up to ~100 km and
+    within about 10 m up to several thousand km, with no per-pair iteration."""
+    beta1 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lat1)))
+    beta2 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lat2)))
+    d_lambda = np.radians(np.asarray(lon2) - np.asarray(lon1))
+    a = np.sin((beta2 - beta1) / 2) ** 2 + np.cos(beta1) * np.cos(beta2) * np.sin(d_lambda / 2) ** 2
+    sigma = 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    p = (beta1 + beta2) / 2
+    q = (beta2 - beta1) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = (sigma - np.sin(sigma)) * np.sin(p) ** 2 * np.cos(q) ** 2 / np.cos(sigma / 2) ** 2
+        y = (sigma + np.sin(sigma)) * np.cos(p) ** 2 * np.sin(q) ** 2 / np.sin(sigma / 2) ** 2
+        distance = WGS84_A_KM * (sigma - WGS84_F / 2 * (x + y))
+    return np.where(sigma > 0, distance, 0.0)
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from uuid import UUID
+
+from sqlalchemy import cast, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.common import Geography
+from app.models.order import DriverLocation
+from app.services.driver_index import driver_index
+from app.services.surge import surge_engine
+
+logger = logging.getLogger(__name__)
+
+
+def geography_point(longitude: float, latitude: float):
+    return cast(func.ST_SetSRID(func.ST_MakePoint(longitude, latitude), 4326), Geography("Point", 4326))
+
+
+async def upsert_driver_locations(db: AsyncSession, points) -> list:
+    """Write ``(driver_id, longitude, latitude, recorded_at)`` points with a single
+    ``INSERT ... ON CONFLICT (driver_id) DO UPDATE``. Only the newest point per
+    driver is sent, and rows already holding a newer position are left alone.
+    Returns the driver ids whose stored position changed."""
+    now = datetime.utcnow()
+    latest = {}
+    for driver_id, longitude, latitude, recorded_at in points:
+        if recorded_at.tzinfo is not None:
+            recorded_at = recorded_at.astimezone(timezone.utc).replace(tzinfo=None)
+        recorded_at = min(recorded_at, now)
+        current = latest.get(driver_id)
+        if current is None or recorded_at > current[2]:
+            latest[driver_id] = (longitude, latitude, recorded_at)
+    if not latest:
+        return []
+
+    stmt = insert(DriverLocation).values([
+        {
+            "driver_id": driver_id,
+            "location": {"type": "Point", "coordinates": [longitude, latitude]},
+            "position": geography_point(longitude, latitude),
+            "updated_at": recorded_at,
+        }
+        for driver_id, (longitude, latitude, recorded_at) in latest.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DriverLocation.driver_id],
+        set_={
+            "location": stmt.excluded.location,
+            "position": stmt.excluded.position,
+            "updated_at": stmt.excluded.updated_at,
+            "updated_up": stmt.excluded.updated_up,
+        },
+        where=DriverLocation.updated_at < stmt.excluded.updated_at,
+    ).returning(DriverLocation.driver_id)
+    written = (await db.execute(stmt)).scalars().all()
+    await db.commit()
+
+    for driver_id in written:
+        longitude, latitude, recorded_at = latest[driver_id]
+        driver_index.upsert(driver_id, longitude, latitude, recorded_at)
+        surge_engine.driver_seen(driver_id, longitude, latitude)
+    return written
+
+
+class LocationSink:
+    """Coalesces driver pings in memory, keeping only the newest point per
+    driver, and writes the dirty set with one bulk upsert every
+    ``flush_interval_ms`` or as soon as ``max_pending`` drivers are waiting.
+    Its loop also prunes stale drivers from the spatial index every
+    ``prune_seconds``; lookups only drop them from the cells they visit."""
+
+    def __init__(self, flush_interval_ms: int, max_pending: int, prune_seconds: int):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_pending = max_pending
+        self.prune_seconds = prune_seconds
+        self._last_prune = time.monotonic()
+        self._lock = threading.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._pending = {}  # driver_id -> (longitude, latitude, recorded_at)
+        self.received = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.flush_errors = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+        self.index_pruned = 0
+
+    def add(self, driver_id: UUID, longitude: float, latitude: float, recorded_at: datetime) -> bool:
+        """Buffer a point and return True once the buffer should be flushed."""
+        # Assignment reads from the index, so buffered positions are visible immediately.
+        driver_index.upsert(driver_id, longitude, latitude, recorded_at)
+        surge_engine.driver_seen(driver_id, longitude, latitude)
+        with self._lock:
+            self.received += 1
+            current = self._pending.get(driver_id)
+            if current is not None:
+                self.coalesced += 1
+                if current[2] > recorded_at:
+                    return False
+            self._pending[driver_id] = (longitude, latitude, recorded_at)
+            return len(self._pending) >= self.max_pending
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                async with SessionLocal() as db:
+                    await upsert_driver_locations(db, [
+                        (driver_id, longitude, latitude, recorded_at)
+                        for driver_id, (longitude, latitude, recorded_at) in batch.items()
+                    ])
+            except Exception:
+                self.flush_errors += 1
+                with self._lock:
+                    for driver_id, point in batch.items():
+                        current = self._pending.get(driver_id)
+                        if current is None or current[2] < point[2]:
+                            self._pending[driver_id] = point
+                raise
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.flushes += 1
+            self.rows_flushed += len(batch)
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self.total_flush_ms += elapsed_ms
+            return len(batch)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Driver location flush failed; points kept for the next attempt")
+            if time.monotonic() - self._last_prune >= self.prune_seconds:
+                self.index_pruned += driver_index.prune()
+                self._last_prune = time.monotonic()
+
+    def metrics(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "received": self.received,
+            "coalesced": self.coalesced,
+            "flushes": self.flushes,
+            "rows_flushed": self.rows_flushed,
+            "flush_errors": self.flush_errors,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "avg_flush_ms": round(self.total_flush_ms / self.flushes, 3) if self.flushes else 0.0,
+            "index_pruned": self.index_pruned,
+        }
+
+
+location_sink = LocationSink(
+    settings.location_flush_interval_ms,
+    settings.location_flush_max_pending,
+    settings.driver_index_prune_seconds,
+)
+metrics.register("location_sink", location_sink.metrics)
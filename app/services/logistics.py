@@ -1,37 +1,42 @@
 from app.core.response import create_success_response
-from fastapi import APIRouter, Depends, HTTPException, status,Request
-from app.schemas.order import GeoPoint, OrderOut
-from app.models.order import Order, OrderStatus,OrderStatusHistory,DriverLocation        
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import Depends, HTTPException, status,Request
+from app.schemas.order import GeoPoint, OrderOut, LocationBatch
+from app.models.order import Order, OrderStatus,DriverLocation
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.security import get_current_driver, get_current_user
-from app.core.database import get_db
+from app.core.security import get_current_driver
+from app.core.database import get_db, serialize
 from app.schemas.user import UserRole
-from sqlalchemy import cast, Text
 from datetime import datetime, timedelta
 from app.models.user import User
-import uuid
-import json
+import math
+import logging
 from uuid import UUID
+from app.services.driver_index import driver_index
+from app.services.location_sink import location_sink, geography_point, upsert_driver_locations
+from app.services.transitions import claim_order, lock_order
+from app.services.surge import surge_engine
 
+logger = logging.getLogger(__name__)
 
-def update_driver_location_service(
-   request: Request, location: GeoPoint, db: Session, current_driver: User
+
+def validate_coordinates(locations):
+    if any(len(location.coordinates) != 2 for location in locations):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="location must contain 'coordinates' with [longitude, latitude]")
+
+
+async def update_driver_location_service(
+   request: Request, location: GeoPoint, db: AsyncSession, current_driver: User
 ):
-    db_location = db.query(DriverLocation).filter(DriverLocation.driver_id == current_driver.id).first()
-    if db_location:
-        db_location.location = location.dict()
-        db_location.updated_at = func.now()
-    else:
-        db_location = DriverLocation(
-            driver_id = current_driver.id,
-            location=location.dict()
-        )
-        db.add(db_location)
-    db.commit()
-    db.refresh(db_location)
+    validate_coordinates([location])
+    if location_sink.add(current_driver.id, location.coordinates[0], location.coordinates[1], datetime.utcnow()):
+        try:
+            await location_sink.flush()
+        except Exception:
+            # The sink keeps the point and the background flush retries it.
+            logger.exception("Inline driver location flush failed")
     return create_success_response(
         data={"message": "Location updated successfully"},
         message="Driver location updated.",
@@ -39,107 +44,162 @@ def update_driver_location_service(
     )
 
 
-async def assign_driver_service(db: Session, pickup_location: dict) -> User:
-    freshness_threshold = datetime.utcnow() - timedelta(minutes=settings.gps_freshness_minutes)
-    coords = pickup_location.get("coordinates", [])
-    if len(coords) != 2:
-        raise ValueError("pickup_location must contain 'coordinates' with [longitude, latitude]")
-    
-    pickup_point = {
-        "type": "Point",
-        "coordinates": coords
-    }
-    pickup_point_json = json.dumps(pickup_point)
+async def ingest_driver_locations_service(
+    request: Request, batch: LocationBatch, db: AsyncSession, current_user: User
+):
+    if current_user.role == UserRole.DISPATCHER:
+        if any(point.driver_id not in (None, current_user.id) for point in batch.points):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Drivers can only report their own location")
+        driver_ids = {current_user.id}
+    elif current_user.role == UserRole.ADMIN:
+        if any(point.driver_id is None for point in batch.points):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="driver_id is required for every point")
+        requested = {point.driver_id for point in batch.points}
+        driver_ids = set((await db.execute(
+            select(User.id).where(User.id.in_(requested), User.role == UserRole.DISPATCHER)
+        )).scalars().all())
+    else:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Driver access required")
+
+    validate_coordinates([point.location for point in batch.points])
+
+    points = [
+        (point.driver_id or current_user.id, point.location.coordinates[0], point.location.coordinates[1], point.recorded_at)
+        for point in batch.points
+        if (point.driver_id or current_user.id) in driver_ids
+    ]
+    written = await upsert_driver_locations(db, points)
+    return create_success_response(
+        data={"received": len(batch.points), "accepted": len(points), "written": len(written)},
+        message="Driver locations ingested.",
+        request_id=request.state.request_id
+    )
 
 
-    active_orders = db.query(Order.driver_id).filter(
-    Order.status.in_(["created", "assigned", "picked_up"])
-    ).subquery()
+async def nearest_drivers(db: AsyncSession, longitude: float, latitude: float, exclude=()) -> list:
+    """Up to ``driver_candidate_pool`` claimable drivers, nearest first. The KNN
+    query over ``driver_locations`` ranks them, since it holds the positions
+    flushed by every worker; this worker's index only adds drivers whose newer,
+    not yet flushed pings put them closer than the table's best. An indexed
+    position that the table has since overtaken (another worker flushed a
+    newer one) is ignored: the KNN already ranked it.
 
-    nearest_driver = (
-        db.query(User, DriverLocation.location)
+    Nothing is locked. Capacity can run out between this read and the claim,
+    so callers claim with ``claim_order`` and move on to the next candidate."""
+    freshness_threshold = datetime.utcnow() - timedelta(minutes=settings.gps_freshness_minutes)
+    exclude = set(exclude)
+    point = geography_point(longitude, latitude)
+
+    # KNN over the GiST index on driver_locations.position.
+    query = (
+        select(User, func.ST_Distance(DriverLocation.position, point))
         .join(DriverLocation, User.id == DriverLocation.driver_id)
-        .filter(
+        .where(
             User.role == UserRole.DISPATCHER,
             User.is_verified == True,
             DriverLocation.updated_at >= freshness_threshold,
-           # User.id.notin_(select(active_orders.c.driver_id))
-        )
-        .order_by(
-            func.ST_Distance(
-                func.ST_SetSRID(func.ST_GeomFromGeoJSON(cast(DriverLocation.location, Text)), 4326),
-                func.ST_SetSRID(func.ST_GeomFromGeoJSON(cast(pickup_point_json, Text)), 4326)
-            )
+            DriverLocation.position.isnot(None),
+            User.active_orders < settings.driver_capacity,
         )
-        .limit(1)
-        .first()
     )
-
-    if not nearest_driver:
-        return None
-
-    return nearest_driver[0]
-
-
-async def retry_assign_driver(db: Session, order_id: UUID, retry_count: int, max_retries: int = 12):
-    """Retry assigning a driver every 5 minutes, up to 1 hour (12 retries)."""
-    db_order = db.query(Order).filter(Order.id == order_id).first()
-    if not db_order or db_order.status != OrderStatus.CREATED:
-        return
-    driver = await assign_driver_service(db, db_order.pickup_location)
-    if driver:
-        db_order.driver_id = driver.id
-        db_order.status = OrderStatus.ASSIGNED
-        status_history = OrderStatusHistory(
-            order_id=order_id,
-            status=OrderStatus.ASSIGNED,
-            changed_by_id=db_order.driver_id,
+    if exclude:
+        query = query.where(User.id.notin_(exclude))
+    ranked = (await db.execute(
+        query
+        .order_by(DriverLocation.position.op("<->")(point))
+        .limit(settings.driver_candidate_pool)
+    )).all()
+    best_km = ranked[0][1] / 1000 if ranked else math.inf
+
+    exclude.update(driver.id for driver, _ in ranked)
+    closer = [
+        driver_id for driver_id, distance_km in
+        driver_index.nearest(longitude, latitude, k=settings.driver_candidate_pool, exclude=exclude)
+        if distance_km < best_km
+    ]
+    if closer:
+        seen_at = {driver_id: driver_index.seen_at(driver_id) for driver_id in closer}
+        claimable = {
+            driver.id: driver for driver, updated_at in (await db.execute(
+                select(User, DriverLocation.updated_at)
+                .join(DriverLocation, User.id == DriverLocation.driver_id)
+                .where(
+                    User.id.in_(closer),
+                    User.role == UserRole.DISPATCHER,
+                    User.is_verified == True,
+                    User.active_orders < settings.driver_capacity,
+                )
+            )).all()
+            if seen_at[driver.id] is not None and updated_at < seen_at[driver.id]
+        }
+        closer = [claimable[driver_id] for driver_id in closer if driver_id in claimable]
+    return closer + [driver for driver, _ in ranked]
+
+
+async def fresh_driver_positions(db: AsyncSession) -> list:
+    """``(driver_id, longitude, latitude, free_slots)`` for every driver with spare
+    capacity. Nothing is locked: location writes keep flowing during a dispatch
+    tick, and ``claim_order`` takes the capacity atomically when a pair is claimed."""
+    freshness_threshold = datetime.utcnow() - timedelta(minutes=settings.gps_freshness_minutes)
+    await location_sink.flush()
+    rows = (await db.execute(
+        select(User.id, User.active_orders, DriverLocation.location)
+        .join(DriverLocation, User.id == DriverLocation.driver_id)
+        .where(
+            User.role == UserRole.DISPATCHER,
+            User.is_verified == True,
+            User.active_orders < settings.driver_capacity,
+            DriverLocation.updated_at >= freshness_threshold,
         )
-        db.add(status_history)
-        db.commit()
-        return
-    if retry_count >= max_retries:
-        db_order.status = OrderStatus.FAILED
-        status_history = OrderStatusHistory(
-            id=uuid.uuid4(),
-            order_id=order_id,
-            status=OrderStatus.FAILED,
-            changed_by_id=None,
-        )  
-        db.add(status_history)
-        db.commit()
-        return 
-    from time import sleep
-    sleep(300)
-    await retry_assign_driver(db, order_id, retry_count +1, max_retries)
-
-
-
-
-async def assign_driver_to_order_service(request: Request,order_id: int, db:Session = Depends(get_db), current_dispatcher: User = Depends(get_current_driver)):
-    db_order = db.query(Order).filter(Order.id == order_id).first()
+    )).all()
+    return [
+        (driver_id, location["coordinates"][0], location["coordinates"][1], settings.driver_capacity - active_orders)
+        for driver_id, active_orders, location in rows
+        if len(location.get("coordinates", [])) == 2
+    ]
+
+
+async def assign_driver_service(db: AsyncSession, order_id: UUID, pickup_location: dict, changed_by_id: UUID | None) -> User | None:
+    """Claim the nearest driver with capacity for a CREATED order the caller has
+    locked, falling back to the next candidate when a driver fills up
+    concurrently. Returns the driver, or None. The caller commits."""
+    coords = pickup_location.get("coordinates", [])
+    if len(coords) != 2:
+        raise ValueError("pickup_location must contain 'coordinates' with [longitude, latitude]")
+    for driver in await nearest_drivers(db, coords[0], coords[1]):
+        if await claim_order(db, order_id, driver.id, changed_by_id):
+            return driver
+    return None
+
+
+async def warm_driver_index(db: AsyncSession):
+    freshness_threshold = datetime.utcnow() - timedelta(minutes=settings.gps_freshness_minutes)
+    rows = (await db.execute(
+        select(DriverLocation.driver_id, DriverLocation.location, DriverLocation.updated_at)
+        .where(DriverLocation.updated_at >= freshness_threshold)
+    )).all()
+    for driver_id, location, updated_at in rows:
+        coords = location.get("coordinates", [])
+        if len(coords) == 2:
+            driver_index.upsert(driver_id, coords[0], coords[1], updated_at)
+
+
+async def assign_driver_to_order_service(request: Request,order_id: int, db: AsyncSession = Depends(get_db), current_dispatcher: User = Depends(get_current_driver)):
+    db_order = await lock_order(db, order_id)
     if not db_order:
+        if (await db.execute(select(Order.id).where(Order.id == order_id))).first():
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Order is already being assigned")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
     if db_order.status != OrderStatus.CREATED:
        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Order not in created status") 
-    driver = await assign_driver_service(db, db_order.pickup_location)
+    driver = await assign_driver_service(db, db_order.id, db_order.pickup_location, current_dispatcher.id)
     if not driver:
+        await db.rollback()
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No available drivers")
-    
-    db_order.driver_id = driver.id
-    db_order.status = OrderStatus.ASSIGNED
-    db.commit()
-    db.refresh(db_order)
-    status_history = OrderStatusHistory(
-        order_id=db_order.id,
-        status=OrderStatus.ASSIGNED,
-        changed_by_id=current_dispatcher.id
-    )
-    db.add(status_history)
-    db.commit()
+    await db.commit()
+    surge_engine.order_closed(db_order.id)
     return create_success_response(
-        data=OrderOut.from_orm(db_order),
+        data=await serialize(db, OrderOut, db_order),
         message="Driver assigned successfully",
         request_id=request.state.request_id
     )
-
@@ -0,0 +1,94 @@
+from typing import List, Tuple
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from app.core.config import settings
+
+
+def hungarian(cost: np.ndarray) -> List[Tuple[int, int]]:
+    rows, cols = linear_sum_assignment(cost)
+    return list(zip(rows.tolist(), cols.tolist()))
+
+
+def greedy(cost: np.ndarray) -> List[Tuple[int, int]]:
+    """Rounds of mutual best picks: every open row proposes its cheapest open
+    column and each column keeps its cheapest proposer."""
+    n_rows, n_cols = cost.shape
+    open_rows = np.arange(n_rows)
+    open_cols = np.ones(n_cols, dtype=bool)
+    pairs = []
+    while open_rows.size and open_cols.any():
+        masked = np.where(open_cols[None, :], cost[open_rows], np.inf)
+        proposals = masked.argmin(axis=1)
+        proposal_cost = masked[np.arange(open_rows.size), proposals]
+        order = np.lexsort((proposal_cost, proposals))
+        first = np.ones(order.size, dtype=bool)
+        first[1:] = proposals[order][1:] != proposals[order][:-1]
+        winners = order[first]
+        pairs.extend(zip(open_rows[winners].tolist(), proposals[winners].tolist()))
+        open_cols[proposals[winners]] = False
+        keep = np.ones(open_rows.size, dtype=bool)
+        keep[winners] = False
+        open_rows = open_rows[keep]
+    return pairs
+
+
+def improve(cost: np.ndarray, pairs: List[Tuple[int, int]], max_passes: int = 5) -> List[Tuple[int, int]]:
+    """Local search over a matching: move rows onto cheaper unused columns and
+    apply the best disjoint pairwise swaps until nothing improves."""
+    if not pairs:
+        return pairs
+    rows = np.array([row for row, _ in pairs])
+    cols = np.array([col for _, col in pairs])
+    for _ in range(max_passes):
+        improved = False
+
+        unused = np.ones(cost.shape[1], dtype=bool)
+        unused[cols] = False
+        if unused.any():
+            free_cols = np.flatnonzero(unused)
+            alternatives = cost[np.ix_(rows, free_cols)]
+            best = alternatives.argmin(axis=1)
+            gain = cost[rows, cols] - alternatives[np.arange(rows.size), best]
+            claimed = set()
+            for k in np.argsort(-gain):
+                if gain[k] <= 0:
+                    break
+                if best[k] in claimed:
+                    continue
+                claimed.add(best[k])
+                cols[k] = free_cols[best[k]]
+                improved = True
+
+        current = cost[rows, cols]
+        crossed = cost[np.ix_(rows, cols)]
+        gain = current[:, None] + current[None, :] - crossed - crossed.T
+        np.fill_diagonal(gain, 0)
+        touched = np.zeros(rows.size, dtype=bool)
+        candidates = np.flatnonzero(gain > 1e-9)
+        if candidates.size > 4 * rows.size:
+            candidates = candidates[np.argpartition(-gain.ravel()[candidates], 4 * rows.size)[:4 * rows.size]]
+        for flat in candidates[np.argsort(-gain.ravel()[candidates])]:
+            a, b = divmod(int(flat), rows.size)
+            if touched[a] or touched[b]:
+                continue
+            cols[a], cols[b] = cols[b], cols[a]
+            touched[a] = touched[b] = True
+            improved = True
+
+        if not improved:
+            break
+    return list(zip(rows.tolist(), cols.tolist()))
+
+
+def solve_assignment(cost: np.ndarray) -> List[Tuple[int, int]]:
+    """Minimum-cost matching of rows (orders) to columns (drivers). Exact
+    Hungarian while the smaller side is at most ``matching_exact_max_side``,
+    greedy plus local improvement above that. Hungarian's cost follows the
+    smaller side, so rectangular batches stay exact (see benchmarks/matching.py)."""
+    if cost.size == 0:
+        return []
+    if min(cost.shape) <= settings.matching_exact_max_side:
+        return hungarian(cost)
+    return improve(cost, greedy(cost))
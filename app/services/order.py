@@ -1,7 +1,10 @@
-from app.schemas.order import GeoPoint, OrderOut, OrderCreate, OrderFullOut, ProofOfDeliveryOut
+from app.schemas.order import GeoPoint, OrderOut, OrderCreate, OrderFullOut, ProofOfDeliveryOut, OrderPage
 from fastapi import Depends, HTTPException, status, UploadFile, File,Request,BackgroundTasks
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db, serialize, read_session_factory
+from fastapi.responses import StreamingResponse
 from app.core.security import get_current_driver, get_current_user
 from app.models.user import User
 from app.models.order import Order, OrderStatus,OrderStatusHistory, ProofOfDelivery
@@ -10,10 +13,18 @@ from app.schemas.user import UserRole
 from pathlib import Path
 import shutil
 import uuid
+import base64
+import csv
+import io
+import json
+from datetime import datetime
 from app.core.response import create_success_response
 from app.services.utils import validate_image_file
-from app.services.payment import calculate_price_service
+from app.services.payment import calculate_price_service, redeem_quote_token
 from app.services.email import send_order_confirmation_email
+from app.services.transitions import apply_driver_load, open_order, transition_order
+from uuid import UUID
+from app.services.surge import surge_engine
 
 
 
@@ -22,16 +33,20 @@ async def create_order_service(
     background_tasks: BackgroundTasks,
     order: OrderCreate,
     goods_image: UploadFile =File(None),
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_db), 
     current_customer: User = Depends(get_current_user),
 ): 
-    price = await calculate_price_service(order.pickup_location.dict(), order.delivery_location.dict(), order.package_details.dict())    
+    price = None
+    if order.quote_token:
+        price = redeem_quote_token(order.quote_token, order.pickup_location.dict(), order.delivery_location.dict(), order.package_details.dict(), current_customer.email)
+    if price is None:
+        price = await calculate_price_service(order.pickup_location.dict(), order.delivery_location.dict(), order.package_details.dict())    
 
     goods_image_path = None
     if goods_image:
         await validate_image_file(goods_image)
     db_order = Order(
-        customer_id=current_customer.id,
+        customer=current_customer,
         pickup_location=order.pickup_location.dict(),
         delivery_location=order.delivery_location.dict(),
         package_details= order.package_details.dict(),
@@ -41,17 +56,9 @@ async def create_order_service(
         is_verified=False,
         status=OrderStatus.CREATED
     )
-    db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
-
-    status_history = OrderStatusHistory(
-        order_id=db_order.id,
-        status=OrderStatus.CREATED,
-        changed_by_id=current_customer.id
-    )
-    db.add(status_history)
-    db.commit()
+    open_order(db, db_order, current_customer.id)
+    await db.commit()
+    surge_engine.order_opened(db_order.id, order.pickup_location.coordinates[0], order.pickup_location.coordinates[1])
 
     background_tasks.add_task(
         send_order_confirmation_email,
@@ -62,7 +69,7 @@ async def create_order_service(
     )
 
     return create_success_response(
-        data=OrderOut.model_validate(db_order, from_attributes=True),
+        data=await serialize(db, OrderOut, db_order),
         message="Order created successfully.",
         code=201,
         request_id=request.state.request_id
@@ -71,42 +78,44 @@ async def create_order_service(
 
 
 
-def update_order_status_service(request: Request, order_id: int, status: OrderOut, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    db_order = db.query(Order).filter(Order.id == order_id).first()
+async def update_order_status_service(request: Request, order_id: UUID, new_status: OrderStatus, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    db_order = (await db.execute(select(Order).where(Order.id == order_id))).scalars().first()
     if not db_order:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, details="Order not found")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
     
+    # CREATED -> ASSIGNED only happens through claim_order, which also takes
+    # the driver's capacity and sets driver_id.
     valid_transitions = {
-        OrderStatus.CREATED: [OrderStatus.ASSIGNED, OrderStatus.CANCELLED],
+        OrderStatus.CREATED: [OrderStatus.CANCELLED],
         OrderStatus.ASSIGNED: [OrderStatus.PICKED_UP, OrderStatus.CANCELLED, OrderStatus.FAILED],
         OrderStatus.PICKED_UP: [OrderStatus.DELIVERED, OrderStatus.FAILED],
         OrderStatus.CANCELLED: [],
         OrderStatus.FAILED: [],
         OrderStatus.DELIVERED: []
     }
-    if status not in valid_transitions[db_order.status]:
+    if new_status not in valid_transitions[db_order.status]:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid status transition")
     
-    if status in [OrderStatus.PICKED_UP, OrderStatus.DELIVERED, OrderStatus.FAILED] and current_user.role != UserRole.DRIVER:
+    if new_status in [OrderStatus.PICKED_UP, OrderStatus.DELIVERED, OrderStatus.FAILED] and current_user.role != UserRole.DISPATCHER:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only drivers can update to this status")
-    if status == OrderStatus.CANCELLED and current_user.role not in [UserRole.CUSTOMER, UserRole.DISPATCHER]:
+    if new_status == OrderStatus.CANCELLED and current_user.role not in [UserRole.CUSTOMER, UserRole.DISPATCHER]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only customers or dispatchers can cancel")
+    if current_user.role == UserRole.CUSTOMER and db_order.customer_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not your order")
+    if current_user.role == UserRole.DISPATCHER and db_order.driver_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not your order")
     
-    db_order.status = status
-    db.commit()
-    db.refresh(db_order)
-    
-    status_history = OrderStatusHistory(
-        order_id=db_order.id,
-        status=status,
-        changed_by_id=current_user.id
-    )
-    db.add(status_history)
-    db.commit()
+    old_status = db_order.status
+    await apply_driver_load(db, db_order.driver_id, old_status, new_status)
+    if await transition_order(db, db_order.id, [old_status], new_status, current_user.id) is None:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Order status changed, please retry")
+    await db.commit()
+    surge_engine.order_closed(db_order.id)
 
     return create_success_response(
-        data=OrderOut.from_orm(db_order),
-        message=f"Order status updated to {status}.",
+        data=await serialize(db, OrderOut, db_order),
+        message=f"Order status updated to {new_status.value}.",
         request_id=request.state.request_id
     )
 
@@ -119,10 +128,10 @@ async def upload_proof_of_delivery_service(
     order_id: int,
     image: UploadFile = File(None),
     signature: UploadFile = File(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_driver: User = Depends(get_current_driver)
 ):
-    db_order = db.query(Order).filter(Order.id == order_id).first()
+    db_order = (await db.execute(select(Order).where(Order.id == order_id))).scalars().first()
     if not db_order:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
     if db_order.status != OrderStatus.DELIVERED:
@@ -154,8 +163,8 @@ async def upload_proof_of_delivery_service(
         signature_path=str(signature_path) if signature_path else None
     )
     db.add(db_proof)
-    db.commit()
-    db.refresh(db_proof)
+    await db.commit()
+    await db.refresh(db_proof)
     
     return create_success_response(
         data=ProofOfDeliveryOut.from_orm(db_proof),
@@ -166,8 +175,19 @@ async def upload_proof_of_delivery_service(
 
 
 
-def get_order_service(request: Request,order_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    db_order = db.query(Order).filter(Order.id == order_id).first()
+async def get_order_service(request: Request,order_id: UUID, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    # Two queries whatever the history length: the order with its to-one
+    # relations joined, then the history rows with their authors.
+    db_order = (await db.execute(
+        select(Order)
+        .where(Order.id == order_id)
+        .options(
+            joinedload(Order.customer),
+            joinedload(Order.driver),
+            joinedload(Order.proof_of_delivery),
+            selectinload(Order.status_history).joinedload(OrderStatusHistory.changed_by),
+        )
+    )).scalars().first()
     if not db_order:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
     
@@ -176,7 +196,143 @@ def get_order_service(request: Request,order_id: int, db: Session = Depends(get_
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view this order")
     
     return create_success_response(
-        data=OrderFullOut.from_orm(db_order),
+        data=OrderFullOut.model_validate(db_order, from_attributes=True),
         message="Order retrieved successfully.",
         request_id=request.state.request_id
     )
+
+
+
+
+def encode_order_cursor(db_order: Order) -> str:
+    return base64.urlsafe_b64encode(f"{db_order.created_at.isoformat()}|{db_order.id}".encode()).decode()
+
+
+def decode_order_cursor(cursor: str) -> tuple:
+    try:
+        created_at, order_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), UUID(order_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+async def list_orders_service(
+    request: Request,
+    db: AsyncSession,
+    current_user: User,
+    customer_id: UUID | None = None,
+    driver_id: UUID | None = None,
+    order_status: OrderStatus | None = None,
+    limit: int = 20,
+    cursor: str | None = None,
+):
+    """Newest orders first, keyset-paginated on ``(created_at, id)`` so every
+    page is an index range scan no matter how deep the client pages."""
+    if current_user.role not in [UserRole.ADMIN, UserRole.DISPATCHER]:
+        if customer_id not in (None, current_user.id) or driver_id is not None:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view these orders")
+        customer_id = current_user.id
+
+    query = select(Order).options(joinedload(Order.customer), joinedload(Order.driver))
+    if customer_id is not None:
+        query = query.where(Order.customer_id == customer_id)
+    if driver_id is not None:
+        query = query.where(Order.driver_id == driver_id)
+    if order_status is not None:
+        query = query.where(Order.status == order_status)
+    if cursor:
+        query = query.where(tuple_(Order.created_at, Order.id) < decode_order_cursor(cursor))
+    # One extra row tells us whether there is a next page.
+    orders = (await db.execute(
+        query.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1)
+    )).scalars().all()
+
+    next_cursor = encode_order_cursor(orders[limit - 1]) if len(orders) > limit else None
+    return create_success_response(
+        data=OrderPage(
+            items=[OrderOut.model_validate(db_order, from_attributes=True) for db_order in orders[:limit]],
+            next_cursor=next_cursor,
+        ),
+        message="Orders retrieved successfully.",
+        request_id=request.state.request_id
+    )
+
+
+
+
+EXPORT_COLUMNS = [
+    Order.id, Order.customer_id, Order.driver_id, Order.payment_id, Order.status, Order.is_verified,
+    Order.price, Order.pickup_location, Order.delivery_location, Order.package_details,
+    Order.recipient_details, Order.created_at, Order.updated_up,
+]
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _export_record(row) -> dict:
+    record = dict(row._mapping)
+    record["status"] = record["status"].value
+    return record
+
+
+def _encode_ndjson(rows) -> str:
+    return "".join(json.dumps(_export_record(row), default=str) + "\n" for row in rows)
+
+
+def _encode_csv(rows, header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow([column.key for column in EXPORT_COLUMNS])
+    for row in rows:
+        record = _export_record(row)
+        writer.writerow([
+            json.dumps(value) if isinstance(value, (dict, list)) else value
+            for value in record.values()
+        ])
+    return buffer.getvalue()
+
+
+async def export_orders_service(
+    request: Request,
+    export_format: str,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    order_status: OrderStatus | None = None,
+):
+    """Stream every matching order as NDJSON or CSV. Rows come off a
+    server-side cursor ``order_export_batch_size`` at a time and are written out
+    as they arrive, so memory stays flat whatever the row count."""
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unsupported export format")
+
+    query = select(*EXPORT_COLUMNS)
+    if created_from is not None:
+        query = query.where(Order.created_at >= created_from)
+    if created_to is not None:
+        query = query.where(Order.created_at < created_to)
+    if order_status is not None:
+        query = query.where(Order.status == order_status)
+    query = query.order_by(Order.created_at, Order.id).execution_options(yield_per=settings.order_export_batch_size)
+
+    # The request's own session is closed before the body is sent, so the
+    # stream opens one for as long as it runs.
+    session_factory = await read_session_factory(request)
+
+    async def stream():
+        async with session_factory() as db:
+            result = await db.stream(query)
+            header = True
+            async for rows in result.partitions():
+                if export_format == "csv":
+                    yield _encode_csv(rows, header)
+                    header = False
+                else:
+                    yield _encode_ndjson(rows)
+            if header and export_format == "csv":
+                yield _encode_csv([], header)
+
+    return StreamingResponse(
+        stream(),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="orders.{export_format}"'},
+    )
@@ -1,21 +1,24 @@
 from app.core.config import settings
 from fastapi import APIRouter, Depends, HTTPException, status, Request, BackgroundTasks
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.core.security import get_current_driver, get_current_user
 import httpx
 from app.models.user import User
 from app.core.response import create_success_response
-import requests
 from app.models.payment import Payment
-from app.schemas.payment import PaymentOut
+from app.schemas.payment import PaymentOut, QuoteOut, QuoteRequest
 from app.schemas.order import OrderCreate
 import uuid
 from sqlalchemy.dialects.postgresql import UUID
 from app.models.order import Order, OrderStatus, OrderStatusHistory
-from app.services.logistics import assign_driver_service , retry_assign_driver
+from app.services.logistics import assign_driver_service
+from app.services.transitions import lock_order
+from app.services.surge import surge_engine
 from app.core.config import settings
-from geopy.distance import geodesic
+from app.services.pricing import price_quotes, quote_key
+from app.core import security
 from app.services.email import send_driver_assignment_email, send_payment_success_email
 
 
@@ -27,23 +30,57 @@ PAYSTACK_HEADERS = {
 }
 
 async def calculate_price_service(pickup_location: dict, delivery_location: dict, package_details: dict) -> float:
-    pickup_coords = (pickup_location["coordinates"][1], pickup_location["coordinates"][0])
-    
-    delivery_coords = (delivery_location["coordinates"][1], delivery_location["coordinates"][0])
-     
-    distance_km = geodesic(pickup_coords, delivery_coords).km
-
-    base_price = distance_km * settings.base_price_per_km
-
-    weight_price = package_details["weight_kg"] * settings.weight_price_per_kg
-
-    demand_price = (base_price + weight_price) * settings.demand_multiplier
-
-    return round(demand_price, 2)
+    [(_, price)] = price_quotes([pickup_location["coordinates"]], [delivery_location["coordinates"]], [package_details["weight_kg"]])
+    return price
+
+
+def redeem_quote_token(quote_token: str, pickup_location: dict, delivery_location: dict, package_details: dict, email: str) -> float | None:
+    """Price carried by a valid, unexpired quote token issued to ``email`` for
+    the same (rounded) route and weight bucket, or None."""
+    payload = security.decode_quote_token(quote_token)
+    if not payload or payload.get("sub") != email:
+        return None
+    quoted = quote_key(payload["pickup"], payload["delivery"], payload["weight_kg"], payload["mode"])
+    requested = quote_key(pickup_location["coordinates"], delivery_location["coordinates"], package_details["weight_kg"], payload["mode"])
+    if quoted != requested:
+        return None
+    return payload["price"]
+
+
+def quote_prices_service(request: Request, quote_request: QuoteRequest, current_user: User):
+    candidates = quote_request.candidates
+    if any(len(candidate.pickup_location.coordinates) != 2 or len(candidate.delivery_location.coordinates) != 2 for candidate in candidates):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Locations must contain 'coordinates' with [longitude, latitude]")
+    mode = quote_request.mode or settings.pricing_distance_mode
+    quotes = price_quotes(
+        [candidate.pickup_location.coordinates for candidate in candidates],
+        [candidate.delivery_location.coordinates for candidate in candidates],
+        [candidate.weight_kg for candidate in candidates],
+        mode,
+    )
+    return create_success_response(
+        data=[
+            QuoteOut(
+                distance_km=round(distance, 3),
+                price=price,
+                quote_token=security.create_quote_token({
+                    "sub": current_user.email,
+                    "pickup": candidate.pickup_location.coordinates,
+                    "delivery": candidate.delivery_location.coordinates,
+                    "weight_kg": candidate.weight_kg,
+                    "mode": mode,
+                    "price": price,
+                }),
+            )
+            for candidate, (distance, price) in zip(candidates, quotes)
+        ],
+        message="Quotes calculated successfully.",
+        request_id=request.state.request_id
+    )
 
 
-async def initialize_payment_service(request: Request,  order_id: UUID,  db: Session, current_customer: User,) -> dict:
-    db_order = db.query(Order).filter(Order.id == order_id).first()
+async def initialize_payment_service(request: Request,  order_id: UUID,  db: AsyncSession, current_customer: User,) -> dict:
+    db_order = (await db.execute(select(Order).where(Order.id == order_id))).scalars().first()
     if not db_order:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
     if db_order.customer_id != current_customer.id:
@@ -85,12 +122,12 @@ async def initialize_payment_service(request: Request,  order_id: UUID,  db: Ses
         order_id=order_id
     )
     db.add(db_payment)
-    db.commit()
-    db.refresh(db_payment)
+    await db.commit()
+    await db.refresh(db_payment)
     
     db_order.payment_id = db_payment.id
-    db.commit()
-    db.refresh(db_order)
+    await db.commit()
+    await db.refresh(db_order)
 
     return create_success_response(
         data={
@@ -107,13 +144,20 @@ async def verify_payment_service(
     request: Request,
     background_tasks: BackgroundTasks,
     reference: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_customer: User = Depends(get_current_user)
 ):
-    response = requests.get(
-        f"https://api.paystack.co/transaction/verify/{reference}",
-        headers=PAYSTACK_HEADERS
-    ) 
+    try:
+        async with httpx.AsyncClient(timeout=10) as client:
+            response = await client.get(
+                f"https://api.paystack.co/transaction/verify/{reference}",
+                headers=PAYSTACK_HEADERS
+            )
+    except httpx.RequestError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Error connecting to Paystack: {str(exc)}"
+        )
     if response.status_code != 200:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Failed to verify payment")
 
@@ -121,12 +165,16 @@ async def verify_payment_service(
     if not payment_response.get("status"):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=payment_response.get("message"))
 
-    db_payment = db.query(Payment).filter(Payment.reference == reference).first()
+    db_payment = (await db.execute(select(Payment).where(Payment.reference == reference))).scalars().first()
     if not db_payment:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Payment not found")
     if db_payment.customer_id != current_customer.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to verify this payment")
-    db_order = db.query(Order).filter(Order.id == db_payment.order_id).first()
+    # Skip the instant assignment if the dispatch scheduler holds the order.
+    db_order = await lock_order(db, db_payment.order_id)
+    locked = db_order is not None
+    if not locked:
+        db_order = (await db.execute(select(Order).where(Order.id == db_payment.order_id))).scalars().first()
     if not db_order:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
     
@@ -134,35 +182,24 @@ async def verify_payment_service(
     if payment_response["data"]["status"] == "success":
         db_payment.status = "success"
         db_order.is_verified = True
-        db.commit()
-        db.refresh(db_payment)
-        db.refresh(db_order)
-
 
-        driver = await assign_driver_service(db, db_order.pickup_location)
         driver_name, driver_email = None, None
-        if driver:
-            db_order.driver_id = driver.id
-            db_order.status = OrderStatus.ASSIGNED
-            status_history = OrderStatusHistory(
-                order_id=db_order.id,
-                status=OrderStatus.ASSIGNED,
-                changed_by_id=db_order.driver_id
-            )
-            db.add(status_history)
-            db.commit()
-            
-            driver_name = driver.first_name
-            driver_email = driver.email
-            background_tasks.add_task(
-                send_driver_assignment_email,
-                email=driver_email,
-                driver_name=driver_name,
-                order_id=str(db_order.id)
-            )
-
-        else:
-            background_tasks.add_task(retry_assign_driver, db, db_order.id, 1)
+        if locked and db_order.status == OrderStatus.CREATED:
+            driver = await assign_driver_service(db, db_order.id, db_order.pickup_location, None)
+            if driver:
+                driver_name = driver.first_name
+                driver_email = driver.email
+                background_tasks.add_task(
+                    send_driver_assignment_email,
+                    email=driver_email,
+                    driver_name=driver_name,
+                    order_id=str(db_order.id)
+                )
+        # Otherwise the order stays CREATED and the dispatch scheduler keeps matching it.
+        # Payment, verification and any assignment are committed together.
+        await db.commit()
+        if driver_name is not None:
+            surge_engine.order_closed(db_order.id)
         background_tasks.add_task(
             send_payment_success_email,
             email=current_customer.email,
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+import heapq
+from collections import Counter
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.config import settings
+from app.models.order import DriverLocation, Order, OrderStatus
+from app.services.geo import geohash
+
+logger = logging.getLogger(__name__)
+
+
+class SurgeEngine:
+    """Per-zone demand multiplier from rolling counts of open orders and fresh
+    drivers, bucketed by geohash cell.
+
+    Counters move incrementally as orders open/close and drivers ping; entries
+    age out after ``order_ttl`` / ``driver_ttl``. Each zone keeps an
+    exponentially smoothed multiplier with time constant ``window_seconds``
+    that is evaluated in O(1) on read.
+
+    An order opens on the worker that created it but closes on whichever
+    worker claims it, and pings land on any worker, so every ``sync_seconds``
+    the counters are replaced by a snapshot of the open orders and fresh
+    drivers in the database. Between syncs a worker's own events apply
+    incrementally."""
+
+    def __init__(self, precision: int, window_seconds: float, sensitivity: float, max_multiplier: float,
+                 order_ttl_seconds: float, driver_ttl_seconds: float, sync_seconds: float):
+        self.precision = precision
+        self.window = window_seconds
+        self.sensitivity = sensitivity
+        self.max_multiplier = max_multiplier
+        self.order_ttl = order_ttl_seconds
+        self.driver_ttl = driver_ttl_seconds
+        self.sync_seconds = sync_seconds
+        self._lock = threading.Lock()
+        self._orders = {}  # order_id -> (cell, opened_at)
+        self._drivers = {}  # driver_id -> (cell, seen_at)
+        self._expiry = []  # heap of (expires_at, kind, id), one entry per tracked order/driver
+        self._demand = {}  # cell -> open orders
+        self._supply = {}  # cell -> fresh drivers
+        self._zones = {}  # cell -> (smoothed, target, updated_at)
+
+    def cell(self, lon: float, lat: float) -> str:
+        return geohash(lon, lat, self.precision)
+
+    def _target(self, cell: str) -> float:
+        demand = self._demand.get(cell, 0)
+        supply = self._supply.get(cell, 0)
+        ratio = demand / max(supply, 1)
+        return min(self.max_multiplier, max(1.0, 1.0 + self.sensitivity * (ratio - 1.0)))
+
+    def _smoothed(self, cell: str, now: float) -> float:
+        zone = self._zones.get(cell)
+        if zone is None:
+            return 1.0
+        smoothed, target, updated_at = zone
+        return target + (smoothed - target) * math.exp(-(now - updated_at) / self.window)
+
+    def _bump(self, counters: dict, cell: str, delta: int, now: float):
+        current = self._smoothed(cell, now)
+        count = counters.get(cell, 0) + delta
+        if count > 0:
+            counters[cell] = count
+        else:
+            counters.pop(cell, None)
+        self._retarget(cell, current, now)
+
+    def _retarget(self, cell: str, current: float, now: float):
+        target = self._target(cell)
+        if target == 1.0 and abs(current - 1.0) < 1e-3:
+            self._zones.pop(cell, None)
+        else:
+            self._zones[cell] = (current, target, now)
+
+    def _expire(self, now: float):
+        while self._expiry and self._expiry[0][0] <= now:
+            _, kind, key = heapq.heappop(self._expiry)
+            entries, counters, ttl = (
+                (self._orders, self._demand, self.order_ttl) if kind == "order"
+                else (self._drivers, self._supply, self.driver_ttl)
+            )
+            entry = entries.get(key)
+            if entry is None:
+                continue
+            if entry[1] + ttl > now:
+                # Refreshed since this entry was scheduled; check again later.
+                heapq.heappush(self._expiry, (entry[1] + ttl, kind, key))
+                continue
+            del entries[key]
+            self._bump(counters, entry[0], -1, now)
+
+    def order_opened(self, order_id: UUID, lon: float, lat: float):
+        now = time.monotonic()
+        cell = self.cell(lon, lat)
+        with self._lock:
+            self._expire(now)
+            if order_id in self._orders:
+                return
+            self._orders[order_id] = (cell, now)
+            heapq.heappush(self._expiry, (now + self.order_ttl, "order", order_id))
+            self._bump(self._demand, cell, 1, now)
+
+    def order_closed(self, order_id: UUID):
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._orders.pop(order_id, None)
+            if entry is not None:
+                self._bump(self._demand, entry[0], -1, now)
+
+    def driver_seen(self, driver_id: UUID, lon: float, lat: float):
+        now = time.monotonic()
+        cell = self.cell(lon, lat)
+        with self._lock:
+            self._expire(now)
+            previous = self._drivers.get(driver_id)
+            self._drivers[driver_id] = (cell, now)
+            if previous is None:
+                heapq.heappush(self._expiry, (now + self.driver_ttl, "driver", driver_id))
+                self._bump(self._supply, cell, 1, now)
+            elif previous[0] != cell:
+                self._bump(self._supply, previous[0], -1, now)
+                self._bump(self._supply, cell, 1, now)
+
+    def load(self, orders, drivers):
+        """Replace every tracked order and driver with ``(id, lon, lat, age_seconds)``
+        snapshots; zones keep their smoothed value and move towards the new targets."""
+        now = time.monotonic()
+        with self._lock:
+            before = set(self._demand) | set(self._supply)
+            current = {cell: self._smoothed(cell, now) for cell in before}
+            self._orders = {order_id: (self.cell(lon, lat), now - age) for order_id, lon, lat, age in orders}
+            self._drivers = {driver_id: (self.cell(lon, lat), now - age) for driver_id, lon, lat, age in drivers}
+            self._expiry = [(seen + self.order_ttl, "order", key) for key, (_, seen) in self._orders.items()]
+            self._expiry += [(seen + self.driver_ttl, "driver", key) for key, (_, seen) in self._drivers.items()]
+            heapq.heapify(self._expiry)
+            self._demand = dict(Counter(cell for cell, _ in self._orders.values()))
+            self._supply = dict(Counter(cell for cell, _ in self._drivers.values()))
+            for cell in before | set(self._demand) | set(self._supply):
+                self._retarget(cell, current.get(cell, self._smoothed(cell, now)), now)
+            self._expire(now)
+
+    async def sync(self, db: AsyncSession):
+        now = datetime.utcnow()
+        orders = (await db.execute(
+            select(Order.id, Order.pickup_location, Order.created_at)
+            .where(Order.status == OrderStatus.CREATED, Order.created_at >= now - timedelta(seconds=self.order_ttl))
+        )).all()
+        drivers = (await db.execute(
+            select(DriverLocation.driver_id, DriverLocation.location, DriverLocation.updated_at)
+            .where(DriverLocation.updated_at >= now - timedelta(seconds=self.driver_ttl))
+        )).all()
+
+        def snapshot(rows):
+            return [
+                (key, location["coordinates"][0], location["coordinates"][1], (now - at).total_seconds())
+                for key, location, at in rows
+                if len(location.get("coordinates", [])) == 2
+            ]
+
+        self.load(snapshot(orders), snapshot(drivers))
+
+    async def run(self, session_factory):
+        while True:
+            try:
+                async with session_factory() as db:
+                    await self.sync(db)
+            except Exception:
+                logger.exception("Surge counter sync failed")
+            await asyncio.sleep(self.sync_seconds)
+
+    def multiplier(self, lon: float, lat: float) -> float:
+        return self._smoothed(self.cell(lon, lat), time.monotonic())
+
+    def metrics(self) -> dict:
+        now = time.monotonic()
+        zones = [self._smoothed(cell, now) for cell in list(self._zones)]
+        return {
+            "open_orders": len(self._orders),
+            "fresh_drivers": len(self._drivers),
+            "surging_zones": sum(1 for value in zones if value > 1.0 + 1e-3),
+            "max_multiplier": round(max(zones, default=1.0), 3),
+        }
+
+
+surge_engine = SurgeEngine(
+    settings.surge_geohash_precision,
+    settings.surge_window_seconds,
+    settings.surge_sensitivity,
+    settings.surge_max_multiplier,
+    settings.assignment_deadline_minutes * 60,
+    settings.gps_freshness_minutes * 60,
+    settings.surge_sync_seconds,
+)
+metrics.register("surge", surge_engine.metrics)
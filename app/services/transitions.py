@@ -0,0 +1,107 @@
+from uuid import UUID
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.order import Order, OrderStatus, OrderStatusHistory
+from app.models.user import User
+
+# Statuses that occupy one unit of the driver's capacity.
+ACTIVE_STATUSES = {OrderStatus.ASSIGNED, OrderStatus.PICKED_UP}
+
+
+async def lock_order(db: AsyncSession, order_id: UUID) -> Order:
+    """Lock an order row for this transaction, or return None if another
+    transaction already holds it."""
+    return (await db.execute(
+        select(Order)
+        .where(Order.id == order_id)
+        .with_for_update(skip_locked=True)
+        .execution_options(populate_existing=True)
+    )).scalars().first()
+
+
+async def claim_driver(db: AsyncSession, driver_id: UUID) -> bool:
+    claimed = (await db.execute(
+        update(User)
+        .where(User.id == driver_id, User.active_orders < settings.driver_capacity)
+        .values(active_orders=User.active_orders + 1)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )).scalar_one_or_none()
+    return claimed is not None
+
+
+async def release_driver(db: AsyncSession, driver_id: UUID):
+    await db.execute(
+        update(User)
+        .where(User.id == driver_id)
+        .values(active_orders=func.greatest(User.active_orders - 1, 0))
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def apply_driver_load(db: AsyncSession, driver_id: UUID, old_status: OrderStatus, new_status: OrderStatus) -> bool:
+    """Keep ``users.active_orders`` in step with an order moving from
+    ``old_status`` to ``new_status``. Must run in the transaction that changes
+    the order. Returns False if the driver has no capacity left."""
+    if driver_id is None:
+        return True
+    if new_status in ACTIVE_STATUSES and old_status not in ACTIVE_STATUSES:
+        return await claim_driver(db, driver_id)
+    if old_status in ACTIVE_STATUSES and new_status not in ACTIVE_STATUSES:
+        await release_driver(db, driver_id)
+    return True
+
+
+def open_order(db: AsyncSession, db_order: Order, changed_by_id: UUID):
+    """Queue a new order together with its CREATED history row, so both are
+    inserted by the commit's single flush. The caller commits."""
+    db.add(db_order)
+    db.add(OrderStatusHistory(
+        order=db_order,
+        status=OrderStatus.CREATED,
+        changed_by_id=changed_by_id
+    ))
+
+
+async def transition_order(
+    db: AsyncSession, order_id: UUID, from_statuses, new_status: OrderStatus, changed_by_id: UUID | None, **values
+) -> Order | None:
+    """Move an order still in one of ``from_statuses`` to ``new_status`` with a
+    single ``UPDATE ... WHERE status IN (...) RETURNING``, and queue its history
+    row for the commit's flush. The session's copy of the order is synced from
+    the returned row, so no refresh is needed. Returns None, with nothing
+    changed, if the order had already moved on. ``changed_by_id`` is None for
+    system transitions made by the scheduler. The caller commits."""
+    db_order = (await db.execute(
+        update(Order)
+        .where(Order.id == order_id, Order.status.in_(from_statuses))
+        .values(status=new_status, **values)
+        .returning(Order)
+    )).scalars().first()
+    if db_order is None:
+        return None
+    db.add(OrderStatusHistory(
+        order_id=order_id,
+        status=new_status,
+        changed_by_id=changed_by_id
+    ))
+    return db_order
+
+
+async def claim_order(db: AsyncSession, order_id: UUID, driver_id: UUID, changed_by_id: UUID | None) -> bool:
+    """Move a CREATED order to ASSIGNED with one conditional
+    ``UPDATE ... WHERE status = 'created' RETURNING``, taking a unit of the
+    driver's capacity first. Returns False, with nothing changed, if the driver
+    is full or the order was no longer CREATED. The caller commits."""
+    if not await claim_driver(db, driver_id):
+        return False
+    claimed = await transition_order(
+        db, order_id, [OrderStatus.CREATED], OrderStatus.ASSIGNED, changed_by_id, driver_id=driver_id
+    )
+    if claimed is None:
+        await release_driver(db, driver_id)
+        return False
+    return True
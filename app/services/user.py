@@ -1,15 +1,19 @@
-from fastapi import HTTPException, status, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
-from app.models.user import User
+from fastapi import HTTPException, status, Request
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.user import UserCreate, StaffCreate, UserOut, Token
 from app.services.email import send_confirmation_email
-from app.core import security, database
-from app.models.user import User, TokenBlackList, UserRole
+from app.core import security
+from app.models.user import User, UserRole
 from jose import jwt, JWTError
 from app.core.config import settings
 from app.schemas.user import Login, RefreshToken
-from app.core.security import create_access_token, create_refresh_token, verify, oauth2_scheme, refresh_access_token
+from app.core.security import create_access_token, create_refresh_token, refresh_access_token
 from app.core.response import  create_success_response
+from app.core.revocation import revocation_key, revocation_list
+from app.core.principals import principal_cache
+from datetime import datetime, timedelta
+from uuid import uuid4
 
 async def send_verfication_email(email: str):
     token = security.create_email_token(email)
@@ -24,8 +28,8 @@ async def send_verfication_email(email: str):
 
 
 
-async def create_user_service(request:Request, user: UserCreate, db: Session, ):
-    db_user = db.query(User).filter(User.email == user.email).first()
+async def create_user_service(request:Request, user: UserCreate, db: AsyncSession, ):
+    db_user = (await db.execute(select(User).where(User.email == user.email))).scalars().first()
     if db_user:
         if db_user.is_verified:
             raise HTTPException(
@@ -36,7 +40,7 @@ async def create_user_service(request:Request, user: UserCreate, db: Session, ):
         else:
             await send_verfication_email(user.email)
             return db_user
-    hashed_password = security.hash(user.password)
+    hashed_password = await security.hash_password(user.password)
     user.password = hashed_password
     db_user = User(
         email = user.email,
@@ -46,8 +50,8 @@ async def create_user_service(request:Request, user: UserCreate, db: Session, ):
         is_verified=False
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     await send_verfication_email(user.email)
     return create_success_response(
         data=UserOut.from_orm(db_user),
@@ -55,7 +59,7 @@ async def create_user_service(request:Request, user: UserCreate, db: Session, ):
         code=201,
         request_id=request.state.request_id)
 
-async def verify_email_service(request:Request, token: str, db: Session):
+async def verify_email_service(request:Request, token: str, db: AsyncSession):
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=["HS256"])
         email: str = payload.get("sub")
@@ -64,7 +68,7 @@ async def verify_email_service(request:Request, token: str, db: Session):
         
     except JWTError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail= "Invalid token")
-    db_user = db.query(User).filter(User.email == email).first()
+    db_user = (await db.execute(select(User).where(User.email == email))).scalars().first()
     if not db_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, details="User not found")
     if db_user.is_verified:
@@ -74,7 +78,8 @@ async def verify_email_service(request:Request, token: str, db: Session):
             request_id=request.state.request_id
         )
     db_user.is_verified = True
-    db.commit()
+    await db.commit()
+    principal_cache.invalidate(email)
     return create_success_response(
         data={"message": "Email verified successfully"},
         message= "Email verified successfully",
@@ -82,19 +87,21 @@ async def verify_email_service(request:Request, token: str, db: Session):
     )
 
 
-def login_user_service(request:Request, user_credentials: Login, db:Session):
-    user = db.query(User).filter(User.email == user_credentials.email).first()
+async def login_user_service(request:Request, user_credentials: Login, db: AsyncSession):
+    user = (await db.execute(select(User).where(User.email == user_credentials.email))).scalars().first()
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     
     if not user.is_verified:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Email not verified")
     
-    if not verify(user_credentials.password, user.password):
+    if not await security.verify_password(user_credentials.password, user.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     
-    access_token = create_access_token({"sub": user.email})
-    refresh_token = create_refresh_token({"sub": user.email})
+    # One session id in both tokens, so logout also kills the refresh token.
+    session = {"sub": user.email, "sid": uuid4().hex}
+    access_token = create_access_token(session, user.token_version)
+    refresh_token = create_refresh_token(session, user.token_version)
 
     return create_success_response(
         data=Token(access_token=access_token,
@@ -104,31 +111,56 @@ def login_user_service(request:Request, user_credentials: Login, db:Session):
     )
 
 
-def logout_user_service(request: Request,token: str, db: Session):
-    # Add token to blacklist
-    db_token = TokenBlackList(token=token)
-    db.add(db_token)
-    db.commit()
+async def logout_user_service(request: Request,token: str, db: AsyncSession):
+    try:
+        claims = jwt.decode(token, settings.secret_key, algorithms=["HS256"])
+    except jwt.ExpiredSignatureError:
+        claims = None # already unusable; nothing to revoke
+    except JWTError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    if claims is not None:
+        if not claims.get("exp"):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+        expires_at = datetime.utcfromtimestamp(claims["exp"])
+        await revocation_list.revoke(db, revocation_key(token, claims), expires_at)
+        if claims.get("sid"):
+            # The session's refresh token was issued at login, so it expires
+            # no later than a refresh lifetime from now.
+            session_expires_at = datetime.utcnow() + timedelta(days=settings.refresh_token_expire_days)
+            await revocation_list.revoke(db, claims["sid"], session_expires_at)
     return create_success_response (data={"message":"Successfully logged out"},
     message="Successfully logged out",
     request_id=request.state.request_id)
 
-def refresh_token_service(request: Request, refresh_token: RefreshToken, db: Session ):
-    token_data = refresh_access_token(refresh_token.refresh_token, db)
+async def logout_all_service(request: Request, db: AsyncSession, current_user: User):
+    await db.execute(
+        update(User)
+        .where(User.id == current_user.id)
+        .values(token_version=User.token_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    principal_cache.invalidate(current_user.email)
+    return create_success_response(data={"message": "Logged out of all sessions"},
+    message="Logged out of all sessions",
+    request_id=request.state.request_id)
+
+async def refresh_token_service(request: Request, refresh_token: RefreshToken, db: AsyncSession ):
+    token_data = await refresh_access_token(refresh_token.refresh_token, db)
     return create_success_response(data=token_data,
                                    message="Token refreshed successfully",
                                    request_id=request.state.request_id)
 
-def create_staff_service(request: Request, staff: StaffCreate, db: Session, current_admin: User):
-    if db.query(User).filter(User.email == staff.email).first():
+async def create_staff_service(request: Request, staff: StaffCreate, db: AsyncSession, current_admin: User):
+    if (await db.execute(select(User.id).where(User.email == staff.email))).first():
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
-    if db.query(User).filter(User.staff_id == staff.staff_id).first():
+    if (await db.execute(select(User.id).where(User.staff_id == staff.staff_id))).first():
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid role for staff")
     
     if staff.role == UserRole.CUSTOMER:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid role for staff")
     
-    hashed_password = security.hash(staff.password)
+    hashed_password = await security.hash_password(staff.password)
     db_user = User(
         email = staff.email,
         first_name = staff.first_name,
@@ -139,8 +171,9 @@ def create_staff_service(request: Request, staff: StaffCreate, db: Session, curr
         staff_id=staff.staff_id
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    principal_cache.invalidate(db_user.email)
     return create_success_response(
         data=UserOut.from_orm(db_user),
         message="Staff user created successfully",
@@ -0,0 +1,142 @@
+"""Concurrent single-order assignment from several processes.
+
+    BENCHMARK_DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.assignment_contention [--orders 2000] [--drivers 1000]
+
+Every process walks all seeded CREATED orders in its own random order and
+runs the path shared by POST /order/{id}/assign-driver and payment
+verification: ``lock_order`` (FOR UPDATE SKIP LOCKED), ``assign_driver_service``
+(KNN candidates, atomic ``claim_order``), commit. All processes race for the
+same orders and the same drivers. ``check`` then verifies that no order and no
+driver was double-assigned; throughput is successful assignments per second
+of wall time, attempts counts every locked CREATED order a process tried.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import random
+import time
+
+import numpy as np
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.models.order import Order, OrderStatus, OrderStatusHistory
+from app.models.user import User, UserRole
+
+CENTER = (3.38, 6.52)  # lon, lat
+SPAN_DEG = 0.2
+
+
+async def _assign_all(url: str, order_ids: list, seed: int) -> tuple:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    from app.services.logistics import assign_driver_service
+    from app.services.transitions import lock_order
+
+    engine = create_async_engine(url)
+    session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    random.Random(seed).shuffle(order_ids)
+    attempts = assigned = 0
+    try:
+        async with session_factory() as db:
+            for order_id in order_ids:
+                db_order = await lock_order(db, order_id)
+                if db_order is not None and db_order.status == OrderStatus.CREATED:
+                    attempts += 1
+                    if await assign_driver_service(db, db_order.id, db_order.pickup_location, None):
+                        assigned += 1
+                await db.commit()
+    finally:
+        await engine.dispose()
+    return attempts, assigned
+
+
+def assign_worker(url: str, order_ids: list, seed: int) -> tuple:
+    return asyncio.run(_assign_all(url, list(order_ids), seed))
+
+
+def run_workers(url: str, order_ids: list, processes: int) -> tuple:
+    """``(attempts, assigned, seconds)`` summed over ``processes`` racing workers."""
+    # spawn: the children must not inherit this process's event loop or connections.
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes) as pool:
+        started = time.perf_counter()
+        results = pool.starmap(assign_worker, [(url, order_ids, seed) for seed in range(processes)])
+        elapsed = time.perf_counter() - started
+    return sum(attempts for attempts, _ in results), sum(assigned for _, assigned in results), elapsed
+
+
+async def check(db, order_ids: list, driver_ids: list) -> dict:
+    """Assignment invariants over the seeded rows; every value must be 0 but ``assigned``."""
+    assigned_orders = (await db.execute(
+        select(Order.id, Order.driver_id)
+        .where(Order.id.in_(order_ids), Order.status == OrderStatus.ASSIGNED)
+    )).all()
+    per_driver = {}
+    for _, driver_id in assigned_orders:
+        per_driver[driver_id] = per_driver.get(driver_id, 0) + 1
+    active_orders = dict((await db.execute(
+        select(User.id, User.active_orders).where(User.id.in_(driver_ids))
+    )).all())
+    history = dict((await db.execute(
+        select(OrderStatusHistory.order_id, func.count())
+        .where(OrderStatusHistory.order_id.in_(order_ids), OrderStatusHistory.status == OrderStatus.ASSIGNED)
+        .group_by(OrderStatusHistory.order_id)
+    )).all())
+    return {
+        "assigned": len(assigned_orders),
+        "overbooked_drivers": sum(count > settings.driver_capacity for count in per_driver.values()),
+        "load_mismatches": sum(active_orders[driver_id] != per_driver.get(driver_id, 0) for driver_id in driver_ids),
+        "double_claimed_orders": sum(count > 1 for count in history.values()),
+        "unrecorded_orders": sum(order_id not in history for order_id, _ in assigned_orders),
+    }
+
+
+async def seed(n_orders: int, n_drivers: int, rng):
+    from benchmarks.pg import make_session_factory, seed_drivers, seed_orders, seed_users
+
+    def positions(n):
+        return list(zip(CENTER[0] + rng.uniform(-SPAN_DEG / 2, SPAN_DEG / 2, n),
+                        CENTER[1] + rng.uniform(-SPAN_DEG / 2, SPAN_DEG / 2, n)))
+
+    engine, session_factory = make_session_factory()
+    try:
+        async with session_factory() as db:
+            driver_ids = await seed_drivers(db, positions(n_drivers))
+            customer_ids = await seed_users(db, 10, UserRole.CUSTOMER)
+            order_ids = await seed_orders(db, customer_ids, positions(n_orders))
+    finally:
+        await engine.dispose()
+    return order_ids, driver_ids
+
+
+async def verify_and_clean(order_ids: list, driver_ids: list) -> dict:
+    from benchmarks.pg import delete_seeded, make_session_factory
+
+    engine, session_factory = make_session_factory()
+    try:
+        async with session_factory() as db:
+            return await check(db, order_ids, driver_ids)
+    finally:
+        async with session_factory() as db:
+            await delete_seeded(db)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    from benchmarks.pg import database_url
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--drivers", type=int, default=1000)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    url = database_url()
+    rng = np.random.default_rng(7)
+    print(f"{'processes':>9} {'attempts':>9} {'assigned':>9} {'seconds':>8} {'assigned/s':>11} {'attempts/s':>11} {'violations':>11}")
+    for processes in args.processes:
+        order_ids, driver_ids = asyncio.run(seed(args.orders, args.drivers, rng))
+        attempts, assigned, elapsed = run_workers(url, order_ids, processes)
+        result = asyncio.run(verify_and_clean(order_ids, driver_ids))
+        violations = sum(value for key, value in result.items() if key != "assigned")
+        assert assigned == result["assigned"], (assigned, result)
+        print(f"{processes:>9} {attempts:>9} {assigned:>9} {elapsed:>8.2f} {assigned / elapsed:>11.1f} {attempts / elapsed:>11.1f} {violations:>11}")
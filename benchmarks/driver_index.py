@@ -0,0 +1,116 @@
+"""Nearest-driver lookups on DriverSpatialIndex against a brute-force scan and
+the SQL path.
+
+    python -m benchmarks.driver_index [--queries 1000] [--k 5] [--cell-deg 0.01] [--sql]
+
+Drivers are spread uniformly over a ~100 km square; each query asks for the
+``k`` nearest and its result is checked against the scan. With ``--sql`` the
+same drivers are also seeded into PostgreSQL (see ``benchmarks.pg``) and
+``nearest_drivers`` is timed with an empty index, i.e. the KNN query over
+the GiST index on ``driver_locations.position`` alone, one rolled back
+transaction per lookup as assignment runs it. ``sql mismatch`` counts queries
+where its driver is not the index's nearest (ties under the spheroid vs the
+sphere are possible, so a handful is expected).
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+from app.services.driver_index import DriverSpatialIndex
+from app.services.geo import haversine_km_array
+
+CENTER = (3.38, 6.52)  # lon, lat
+SPAN_DEG = 0.9
+
+
+async def time_sql(positions, points, nearest_ids) -> tuple:
+    from app.services.logistics import nearest_drivers
+    from benchmarks.pg import delete_seeded, make_session_factory, seed_drivers
+
+    engine, session_factory = make_session_factory()
+    try:
+        async with session_factory() as db:
+            ids = await seed_drivers(db, positions)
+        # Seeded ids are fresh uuids; map them onto the index's ids by position.
+        index_id_of = dict(zip(ids, range(len(ids))))
+        mismatches = 0
+        async with session_factory() as db:
+            started = time.perf_counter()
+            for (lon, lat), expected in zip(points, nearest_ids):
+                drivers = await nearest_drivers(db, float(lon), float(lat))
+                await db.rollback()
+                if not drivers or index_id_of[drivers[0].id] != expected:
+                    mismatches += 1
+            elapsed = time.perf_counter() - started
+        return elapsed, mismatches
+    finally:
+        async with session_factory() as db:
+            await delete_seeded(db)
+        await engine.dispose()
+
+
+def run(n_drivers: int, queries: int, k: int, cell_deg: float, rng, sql: bool) -> dict:
+    lons = CENTER[0] + rng.uniform(-SPAN_DEG / 2, SPAN_DEG / 2, n_drivers)
+    lats = CENTER[1] + rng.uniform(-SPAN_DEG / 2, SPAN_DEG / 2, n_drivers)
+    ids = [uuid.uuid4() for _ in range(n_drivers)]
+    index = DriverSpatialIndex(cell_deg)
+    now = datetime.utcnow()
+    for driver_id, lon, lat in zip(ids, lons, lats):
+        index.upsert(driver_id, float(lon), float(lat), now)
+
+    points = np.column_stack([
+        CENTER[0] + rng.uniform(-SPAN_DEG / 2, SPAN_DEG / 2, queries),
+        CENTER[1] + rng.uniform(-SPAN_DEG / 2, SPAN_DEG / 2, queries),
+    ])
+
+    started = time.perf_counter()
+    results = [index.nearest(float(lon), float(lat), k=k) for lon, lat in points]
+    index_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    mismatches = 0
+    for (lon, lat), found in zip(points, results):
+        distances = haversine_km_array(lon, lat, lons, lats)
+        expected = np.sort(distances)[:k]
+        if not np.allclose([distance for _, distance in found], expected):
+            mismatches += 1
+    scan_s = time.perf_counter() - started
+
+    row = {
+        "drivers": n_drivers,
+        "index_us": index_s / queries * 1e6,
+        "scan_us": scan_s / queries * 1e6,
+        "mismatches": mismatches,
+        "sql_us": None,
+        "sql_mismatches": None,
+    }
+    if sql:
+        position_of = {driver_id: i for i, driver_id in enumerate(ids)}
+        nearest_ids = [position_of[found[0][0]] for found in results]
+        sql_s, row["sql_mismatches"] = asyncio.run(time_sql(list(zip(lons, lats)), points, nearest_ids))
+        row["sql_us"] = sql_s / queries * 1e6
+    return row
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--cell-deg", type=float, default=0.01, help="driver_index_cell_deg")
+    parser.add_argument("--sql", action="store_true", help="also time nearest_drivers on BENCHMARK_DATABASE_URL")
+    args = parser.parse_args()
+    rng = np.random.default_rng(7)
+    header = f"{'drivers':>8} {'index us/query':>15} {'numpy scan us/query':>20} {'mismatches':>11}"
+    if args.sql:
+        header += f" {'sql us/query':>13} {'sql mismatch':>13}"
+    print(header)
+    for n in (1_000, 10_000, 100_000):
+        row = run(n, args.queries, args.k, args.cell_deg, rng, args.sql)
+        line = f"{row['drivers']:>8} {row['index_us']:>15.1f} {row['scan_us']:>20.1f} {row['mismatches']:>11}"
+        if args.sql:
+            line += f" {row['sql_us']:>13.1f} {row['sql_mismatches']:>13}"
+        print(line)
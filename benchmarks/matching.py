@@ -0,0 +1,44 @@
+"""Exact Hungarian against greedy + local improvement on haversine cost matrices.
+
+    python -m benchmarks.matching
+
+Rows are orders and columns are driver slots, both spread over a ~100 km
+square, as the dispatch scheduler builds them. The gap is the heuristic's
+total cost over the optimum.
+"""
+import time
+
+import numpy as np
+
+from app.services.geo import haversine_matrix
+from app.services.matching import greedy, hungarian, improve
+
+CENTER = (3.38, 6.52)  # lon, lat
+SPAN_DEG = 0.9
+SHAPES = [(100, 100), (500, 500), (500, 3000), (1000, 1000), (1500, 3000), (2000, 500), (2000, 2000), (3000, 3000)]
+
+
+def points(rng, n: int) -> np.ndarray:
+    return np.column_stack([
+        CENTER[0] + rng.uniform(-SPAN_DEG / 2, SPAN_DEG / 2, n),
+        CENTER[1] + rng.uniform(-SPAN_DEG / 2, SPAN_DEG / 2, n),
+    ])
+
+
+def total(cost: np.ndarray, pairs) -> float:
+    return float(sum(cost[row, col] for row, col in pairs))
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(1)
+    print(f"{'orders x slots':>15} {'hungarian s':>12} {'heuristic s':>12} {'gap':>8}")
+    for n_orders, n_slots in SHAPES:
+        cost = haversine_matrix(points(rng, n_orders), points(rng, n_slots))
+        started = time.perf_counter()
+        exact = hungarian(cost)
+        exact_s = time.perf_counter() - started
+        started = time.perf_counter()
+        approx = improve(cost, greedy(cost))
+        approx_s = time.perf_counter() - started
+        gap = total(cost, approx) / total(cost, exact) - 1
+        print(f"{f'{n_orders}x{n_slots}':>15} {exact_s:>12.3f} {approx_s:>12.3f} {gap:>8.2%}")
@@ -0,0 +1,123 @@
+"""Throughput and memory of the streaming order export.
+
+    BENCHMARK_DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.order_export [--rows 1000000] [--batch-sizes 500 1000 5000]
+
+Loads ``--rows`` orders (``bulk_load_orders``), then drains
+``export_orders_service`` in process for each format, filter and
+``order_export_batch_size``: rows/s and MB/s of the body, and the check that
+every matching row came out once. A second pass per format runs under
+tracemalloc and reports the peak Python heap, once over all rows and once
+over a tenth of them; flat memory means the two peaks match. The service
+reads through ``read_session_factory``, which is pointed at the benchmark
+database.
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.models.order import Order, OrderStatus
+from app.models.user import UserRole
+from app.services import order as order_service
+
+SPAN_DAYS = 365
+REQUEST = SimpleNamespace(state=SimpleNamespace(request_id=uuid.uuid4()))
+
+
+def filters(now: datetime) -> dict:
+    return {
+        "all": {},
+        "delivered": {"order_status": OrderStatus.DELIVERED},
+        "last 30 days": {"created_from": now - timedelta(days=30)},
+    }
+
+
+async def drain(export_format: str, **filters) -> tuple:
+    """``(rows, bytes, seconds)`` for one full export."""
+    response = await order_service.export_orders_service(REQUEST, export_format, **filters)
+    rows = size = 0
+    started = time.perf_counter()
+    async for chunk in response.body_iterator:
+        size += len(chunk)
+        rows += chunk.count("\n")
+    elapsed = time.perf_counter() - started
+    if export_format == "csv":
+        rows -= 1  # header
+    return rows, size, elapsed
+
+
+async def peak_heap_mb(export_format: str, **filters) -> float:
+    tracemalloc.start()
+    try:
+        await drain(export_format, **filters)
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+async def expected_rows(session_factory, created_from=None, order_status=None) -> int:
+    query = select(func.count()).select_from(Order)
+    if created_from is not None:
+        query = query.where(Order.created_at >= created_from)
+    if order_status is not None:
+        query = query.where(Order.status == order_status)
+    async with session_factory() as db:
+        return (await db.execute(query)).scalar_one()
+
+
+async def main(rows: int, batch_sizes: list):
+    from benchmarks.pg import bulk_load_orders, delete_seeded, make_session_factory, seed_users
+
+    engine, session_factory = make_session_factory()
+
+    async def benchmark_session_factory(request):
+        return session_factory
+
+    order_service.read_session_factory = benchmark_session_factory
+    try:
+        async with session_factory() as db:
+            customer_ids = await seed_users(db, 10_000, UserRole.CUSTOMER)
+            driver_ids = await seed_users(db, 2_000, UserRole.DISPATCHER)
+            await bulk_load_orders(db, rows, customer_ids, driver_ids, SPAN_DAYS)
+        now = datetime.utcnow()
+
+        # The database may hold other orders; the check compares against a count.
+        print(f"{'format':>7} {'filter':>13} {'batch':>6} {'rows':>9} {'rows/s':>9} {'MB/s':>7} {'complete':>9}")
+        for export_format in order_service.EXPORT_FORMATS:
+            for name, export_filters in filters(now).items():
+                expected = await expected_rows(session_factory, **export_filters)
+                for batch_size in batch_sizes:
+                    settings.order_export_batch_size = batch_size
+                    exported, size, elapsed = await drain(export_format, **export_filters)
+                    print(
+                        f"{export_format:>7} {name:>13} {batch_size:>6} {exported:>9} {exported / elapsed:>9.0f} "
+                        f"{size / elapsed / 1e6:>7.1f} {str(exported == expected):>9}"
+                    )
+
+        settings.order_export_batch_size = batch_sizes[0]
+        print(f"\n{'format':>7} {'peak MB, all rows':>18} {'peak MB, 1/10':>14}")
+        for export_format in order_service.EXPORT_FORMATS:
+            full = await peak_heap_mb(export_format)
+            tenth = await peak_heap_mb(export_format, created_from=now - timedelta(days=SPAN_DAYS / 10))
+            print(f"{export_format:>7} {full:>18.1f} {tenth:>14.1f}")
+    finally:
+        async with session_factory() as db:
+            await delete_seeded(db)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    from benchmarks.pg import database_url
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[500, 1000, 5000])
+    args = parser.parse_args()
+    database_url()
+    asyncio.run(main(args.rows, args.batch_sizes))
@@ -0,0 +1,121 @@
+"""GET /order/ listing over a 10M-row orders table.
+
+    BENCHMARK_DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.order_listing [--rows 10000000] [--repeats 200]
+
+Loads ``--rows`` orders (``bulk_load_orders``: 10k customers, 2k drivers,
+a year of history), then for every filter shape ``list_orders_service``
+supports, first page and a page halfway down the history: runs
+``EXPLAIN (ANALYZE, BUFFERS)`` on exactly the statement the service sent,
+prints the indexes the plan used and flags sequential scans, and times
+``--repeats`` calls with random customers/drivers. The seeded rows are
+deleted afterwards, which on 10M rows takes a while.
+"""
+import argparse
+import asyncio
+import random
+import re
+import time
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+from sqlalchemy import event
+
+from app.models.order import OrderStatus
+from app.models.user import UserRole
+from app.services.order import encode_order_cursor, list_orders_service
+
+SPAN_DAYS = 365
+SHAPES = {
+    "customer": lambda customer, driver: {"customer_id": customer},
+    "customer+status": lambda customer, driver: {"customer_id": customer, "order_status": OrderStatus.DELIVERED},
+    "driver": lambda customer, driver: {"driver_id": driver},
+    "driver+status": lambda customer, driver: {"driver_id": driver, "order_status": OrderStatus.ASSIGNED},
+    "status": lambda customer, driver: {"order_status": OrderStatus.CREATED},
+    "all": lambda customer, driver: {},
+}
+PAGES = {
+    "first": None,
+    # Halfway down the history; the largest uuid so the page starts at that instant.
+    "deep": encode_order_cursor(SimpleNamespace(
+        created_at=datetime.utcnow() - timedelta(days=SPAN_DAYS / 2), id=uuid.UUID(int=(1 << 128) - 1),
+    )),
+}
+REQUEST = SimpleNamespace(state=SimpleNamespace(request_id=uuid.uuid4()))
+ADMIN = SimpleNamespace(id=uuid.uuid4(), role=UserRole.ADMIN)
+
+
+async def explain(engine, session_factory, filters: dict, cursor) -> str:
+    """``EXPLAIN (ANALYZE, BUFFERS)`` of the SELECT ``list_orders_service`` sends."""
+    executed = []
+
+    def capture(connection, cursor_, statement, parameters, context, executemany):
+        if statement.lstrip().startswith("SELECT"):
+            executed.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        async with session_factory() as db:
+            await list_orders_service(REQUEST, db, ADMIN, cursor=cursor, **filters)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+    statement, parameters = executed[0]
+    async with engine.connect() as connection:
+        plan = (await connection.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)).scalars().all()
+    return "\n".join(plan)
+
+
+async def time_calls(session_factory, make_filters, cursor, customer_ids, driver_ids, repeats: int, rng) -> np.ndarray:
+    timings = []
+    async with session_factory() as db:
+        for _ in range(repeats):
+            filters = make_filters(rng.choice(customer_ids), rng.choice(driver_ids))
+            started = time.perf_counter()
+            await list_orders_service(REQUEST, db, ADMIN, cursor=cursor, **filters)
+            timings.append((time.perf_counter() - started) * 1000)
+            await db.rollback()
+    return np.array(timings)
+
+
+async def main(rows: int, repeats: int, show_plans: bool):
+    from benchmarks.pg import bulk_load_orders, delete_seeded, make_session_factory, seed_users
+
+    engine, session_factory = make_session_factory()
+    rng = random.Random(7)
+    try:
+        async with session_factory() as db:
+            customer_ids = await seed_users(db, 10_000, UserRole.CUSTOMER)
+            driver_ids = await seed_users(db, 2_000, UserRole.DISPATCHER)
+            started = time.perf_counter()
+            await bulk_load_orders(db, rows, customer_ids, driver_ids, SPAN_DAYS)
+            print(f"loaded {rows} orders in {time.perf_counter() - started:.0f}s")
+
+        print(f"{'shape':>16} {'page':>6} {'p50 ms':>8} {'p99 ms':>8}  plan")
+        for shape, make_filters in SHAPES.items():
+            for page, cursor in PAGES.items():
+                plan = await explain(engine, session_factory, make_filters(customer_ids[0], driver_ids[0]), cursor)
+                indexes = sorted(set(re.findall(r"using (\w+)", plan)))
+                scans = ", ".join(indexes) or "no index"
+                if "Seq Scan on orders" in plan:
+                    scans += "  SEQ SCAN"
+                timings = await time_calls(session_factory, make_filters, cursor, customer_ids, driver_ids, repeats, rng)
+                print(f"{shape:>16} {page:>6} {np.percentile(timings, 50):>8.2f} {np.percentile(timings, 99):>8.2f}  {scans}")
+                if show_plans:
+                    print(plan)
+    finally:
+        async with session_factory() as db:
+            await delete_seeded(db)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    from benchmarks.pg import database_url
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--plans", action="store_true", help="print every plan in full")
+    args = parser.parse_args()
+    database_url()
+    asyncio.run(main(args.rows, args.repeats, args.plans))
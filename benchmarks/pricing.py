@@ -0,0 +1,61 @@
+"""Vectorized pricing distances against the per-call geopy geodesic they replaced.
+
+    python -m benchmarks.pricing
+
+For each batch size, pairs are drawn at two scales: city deliveries (pickup
+and delivery within ~50 km, latitudes up to 60 degrees) and long haul (up to
+~3000 km). The old path called ``geodesic`` once per pair; ``distances_km``
+prices the whole batch in one call per mode. Errors are against geopy's
+Karney geodesic on WGS84 and bound what the docstrings of
+``haversine_km_array`` and ``lambert_km_array`` promise.
+"""
+import time
+
+import numpy as np
+from geopy.distance import geodesic
+
+from app.services.pricing import DISTANCE_MODES, distances_km
+
+SIZES = (1, 100, 1000, 10_000)
+SCALES = {"city": 0.25, "long haul": 15.0}  # half-span of the delivery offset, degrees
+
+
+def pairs(rng, n: int, span_deg: float) -> tuple:
+    pickups = np.column_stack([rng.uniform(-180, 180, n), rng.uniform(-60, 60, n)])
+    offsets = rng.uniform(-span_deg, span_deg, (n, 2))
+    deliveries = np.column_stack([pickups[:, 0] + offsets[:, 0], np.clip(pickups[:, 1] + offsets[:, 1], -89, 89)])
+    return pickups, deliveries
+
+
+def geodesic_km(pickups, deliveries) -> np.ndarray:
+    return np.array([
+        geodesic((p_lat, p_lon), (d_lat, d_lon)).km
+        for (p_lon, p_lat), (d_lon, d_lat) in zip(pickups, deliveries)
+    ])
+
+
+def timed(fn, *args) -> tuple:
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(7)
+    for mode in DISTANCE_MODES:
+        distances_km(*pairs(rng, 10, 1.0), mode)  # warm up numpy before timing single pairs
+    header = f"{'scale':>9} {'pairs':>6} {'geodesic ms':>12}"
+    for mode in DISTANCE_MODES:
+        header += f" {mode + ' ms':>15} {'speedup':>8} {'max err m':>10} {'max rel err':>12}"
+    print(header)
+    for scale, span_deg in SCALES.items():
+        for n in SIZES:
+            pickups, deliveries = pairs(rng, n, span_deg)
+            expected, geodesic_s = timed(geodesic_km, pickups, deliveries)
+            line = f"{scale:>9} {n:>6} {geodesic_s * 1000:>12.3f}"
+            for mode in DISTANCE_MODES:
+                found, mode_s = timed(distances_km, pickups, deliveries, mode)
+                error_km = np.abs(found - expected)
+                relative = np.max(error_km / np.maximum(expected, 1e-9))
+                line += f" {mode_s * 1000:>15.3f} {geodesic_s / mode_s:>8.0f} {np.max(error_km) * 1000:>10.2f} {relative:>12.2e}"
+            print(line)
@@ -0,0 +1,158 @@
+"""Requests per second on order creation and driver location updates.
+
+    BENCHMARK_DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.request_throughput \\
+        --base-url http://127.0.0.1:8000 --label after [--concurrency 1 16 64] [--seconds 20]
+
+Drives a running server over HTTP: ``POST /order/`` as seeded customers and
+``POST /order/location`` as seeded drivers, each path for ``--seconds`` at
+every ``--concurrency`` level, and reports requests/s with p50/p99 latency.
+Tokens are minted locally, so the server must share this process's
+``SECRET_KEY``, and its mail settings should point at a local sink.
+
+For the before/after comparison of the async engine port, run it once against
+a server on the revision before it (the parent of "[user-017] Move to an
+asyncpg AsyncEngine and AsyncSession", e.g. from ``git worktree add``) and once
+against this tree, with the same database migrated to head and the same
+``uvicorn app.main:app --workers N`` settings. The migrations added since
+then are indexes and a relaxed NOT NULL, so the old revision runs against it
+unchanged.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+import numpy as np
+
+from app.core.security import create_access_token
+from app.models.user import UserRole
+
+CENTER = (3.38, 6.52)  # lon, lat
+SPAN_DEG = 0.2
+
+
+def _point(rng) -> dict:
+    return {
+        "type": "Point",
+        "coordinates": [
+            float(CENTER[0] + rng.uniform(-SPAN_DEG / 2, SPAN_DEG / 2)),
+            float(CENTER[1] + rng.uniform(-SPAN_DEG / 2, SPAN_DEG / 2)),
+        ],
+    }
+
+
+def create_order_request(rng) -> dict:
+    order = {
+        "pickup_location": _point(rng),
+        "delivery_location": _point(rng),
+        "package_details": {"weight_kg": 2.5, "dimensions_cm": [20.0, 20.0, 10.0]},
+        "recipient_details": {"name": "Bench", "phone": "+2340000000000"},
+    }
+    return {"method": "POST", "url": "/order/", "data": {"order": json.dumps(order)}}
+
+
+def location_request(rng) -> dict:
+    return {"method": "POST", "url": "/order/location", "json": _point(rng)}
+
+
+PATHS = {
+    "create-order": (UserRole.CUSTOMER, create_order_request),
+    "location": (UserRole.DISPATCHER, location_request),
+}
+
+
+async def _worker(client, token: str, make_request, deadline: float, seed: int, latencies: list, errors: list):
+    rng = np.random.default_rng(seed)
+    headers = {"Authorization": f"Bearer {token}"}
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await client.request(headers=headers, **make_request(rng))
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        if ok:
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors.append(1)
+
+
+async def run_load(base_url: str, tokens: list, make_request, concurrency: int, seconds: float) -> dict:
+    """Closed-loop load: ``concurrency`` clients, each sending its next request
+    when the previous one returns, one token per client."""
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        started = time.perf_counter()
+        deadline = started + seconds
+        await asyncio.gather(*(
+            _worker(client, tokens[i % len(tokens)], make_request, deadline, i, latencies, errors)
+            for i in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+    latencies_ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+    }
+
+
+async def seed_tokens(count: int) -> dict:
+    """``role -> [access token]`` for ``count`` seeded users per role."""
+    from benchmarks.pg import BENCH_EMAIL_DOMAIN, make_session_factory, seed_users
+
+    engine, session_factory = make_session_factory()
+    try:
+        tokens = {}
+        async with session_factory() as db:
+            for role in {role for role, _ in PATHS.values()}:
+                ids = await seed_users(db, count, role)
+                tokens[role] = [create_access_token({"sub": f"{user_id.hex}{BENCH_EMAIL_DOMAIN}"}) for user_id in ids]
+        return tokens
+    finally:
+        await engine.dispose()
+
+
+async def clean():
+    from benchmarks.pg import delete_seeded, make_session_factory
+
+    engine, session_factory = make_session_factory()
+    try:
+        async with session_factory() as db:
+            await delete_seeded(db)
+    finally:
+        await engine.dispose()
+
+
+async def main(args):
+    tokens = await seed_tokens(max(args.concurrency))
+    try:
+        print(f"{'label':>8} {'path':>13} {'clients':>8} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+        for path in args.paths:
+            role, make_request = PATHS[path]
+            for concurrency in args.concurrency:
+                result = await run_load(args.base_url, tokens[role], make_request, concurrency, args.seconds)
+                print(
+                    f"{args.label:>8} {path:>13} {concurrency:>8} {result['requests']:>9} {result['errors']:>7} "
+                    f"{result['rps']:>9.1f} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f}"
+                )
+    finally:
+        await clean()
+
+
+if __name__ == "__main__":
+    from benchmarks.pg import database_url
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--label", default="after")
+    parser.add_argument("--paths", nargs="+", choices=sorted(PATHS), default=sorted(PATHS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--seconds", type=float, default=20.0)
+    args = parser.parse_args()
+    database_url()
+    asyncio.run(main(args))
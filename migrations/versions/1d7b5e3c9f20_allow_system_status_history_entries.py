@@ -0,0 +1,32 @@
+"""allow system status history entries
+
+Revision ID: 1d7b5e3c9f20
+Revises: 9c4e2f7a1b3d
+Create Date: 2026-10-18 11:40:05.227913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1d7b5e3c9f20'
+down_revision: Union[str, None] = '9c4e2f7a1b3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column('order_status_history', 'changed_by_id',
+               existing_type=sa.UUID(),
+               nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('order_status_history', 'changed_by_id',
+               existing_type=sa.UUID(),
+               nullable=False)
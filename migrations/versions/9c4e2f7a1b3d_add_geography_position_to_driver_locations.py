@@ -0,0 +1,36 @@
+"""add geography position to driver_locations
+
+Revision ID: 9c4e2f7a1b3d
+Revises: e749695b574e
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4e2f7a1b3d'
+down_revision: Union[str, None] = 'e749695b574e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS postgis")
+    op.execute("ALTER TABLE driver_locations ADD COLUMN position geography(Point,4326)")
+    op.execute(
+        "UPDATE driver_locations "
+        "SET position = ST_SetSRID(ST_GeomFromGeoJSON(location::text), 4326)::geography "
+        "WHERE location ? 'coordinates'"
+    )
+    op.create_index('ix_driver_locations_position', 'driver_locations', ['position'], unique=False, postgresql_using='gist')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_driver_locations_position', table_name='driver_locations', postgresql_using='gist')
+    op.drop_column('driver_locations', 'position')
@@ -0,0 +1,28 @@
+"""index token_blacklist blacklisted_at
+
+Revision ID: a7c2e94f1d38
+Revises: f3a8c61d0b52
+Create Date: 2026-10-18 21:07:45.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c2e94f1d38'
+down_revision: Union[str, None] = 'f3a8c61d0b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_token_blacklist_blacklisted_at'), 'token_blacklist', ['blacklisted_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_token_blacklist_blacklisted_at'), table_name='token_blacklist')
@@ -0,0 +1,37 @@
+"""add active orders counter to users
+
+Revision ID: b83f0d6a2c47
+Revises: 1d7b5e3c9f20
+Create Date: 2026-10-18 13:05:52.604181
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b83f0d6a2c47'
+down_revision: Union[str, None] = '1d7b5e3c9f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('active_orders', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        "UPDATE users SET active_orders = active.count "
+        "FROM (SELECT driver_id, count(*) AS count FROM orders "
+        "      WHERE status IN ('ASSIGNED', 'PICKED_UP') AND driver_id IS NOT NULL "
+        "      GROUP BY driver_id) AS active "
+        "WHERE users.id = active.driver_id"
+    )
+    op.create_index('ix_users_role_active_orders', 'users', ['role', 'active_orders'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_role_active_orders', table_name='users')
+    op.drop_column('users', 'active_orders')
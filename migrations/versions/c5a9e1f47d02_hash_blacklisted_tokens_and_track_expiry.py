@@ -0,0 +1,51 @@
+"""hash blacklisted tokens and track expiry
+
+Revision ID: c5a9e1f47d02
+Revises: b83f0d6a2c47
+Create Date: 2026-10-18 14:22:17.951336
+
+"""
+from typing import Sequence, Union
+from datetime import datetime
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+from jose import jwt, JWTError
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a9e1f47d02'
+down_revision: Union[str, None] = 'b83f0d6a2c47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('token_blacklist', sa.Column('expires_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_token_blacklist_expires_at'), 'token_blacklist', ['expires_at'], unique=False)
+
+    # Replace stored JWTs with their SHA-256 digest and record each token's exp.
+    bind = op.get_bind()
+    rows = bind.execute(sa.text("SELECT id, token FROM token_blacklist")).fetchall()
+    for row_id, token in rows:
+        try:
+            exp = jwt.get_unverified_claims(token).get("exp")
+        except JWTError:
+            exp = None
+        bind.execute(
+            sa.text("UPDATE token_blacklist SET token = :digest, expires_at = :expires_at WHERE id = :id"),
+            {
+                "id": row_id,
+                "digest": hashlib.sha256(token.encode()).hexdigest(),
+                "expires_at": datetime.utcfromtimestamp(exp) if exp else None,
+            },
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Digests cannot be turned back into tokens; they stay hashed.
+    op.drop_index(op.f('ix_token_blacklist_expires_at'), table_name='token_blacklist')
+    op.drop_column('token_blacklist', 'expires_at')
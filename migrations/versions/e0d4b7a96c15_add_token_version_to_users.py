@@ -0,0 +1,28 @@
+"""add token version to users
+
+Revision ID: e0d4b7a96c15
+Revises: c5a9e1f47d02
+Create Date: 2026-10-18 15:03:48.117520
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e0d4b7a96c15'
+down_revision: Union[str, None] = 'c5a9e1f47d02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,39 @@
+"""add order listing indexes
+
+Revision ID: f3a8c61d0b52
+Revises: e0d4b7a96c15
+Create Date: 2026-10-18 18:41:12.604381
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8c61d0b52'
+down_revision: Union[str, None] = 'e0d4b7a96c15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_orders_customer_id_created_at', ['customer_id', 'created_at']),
+    ('ix_orders_driver_id_status', ['driver_id', 'status']),
+    ('ix_orders_status_created_at', ['status', 'created_at']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # orders is large and hot; build without blocking writes.
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            op.create_index(name, 'orders', columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, _ in INDEXES:
+            op.drop_index(name, table_name='orders', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,163 @@
+import asyncio
+import os
+
+# Settings are read at import time; give the required ones test values.
+for key, value in {
+    "DATABASE_HOSTNAME": "localhost", "DATABASE_PORT": "5432", "DATABASE_PASSWORD": "test",
+    "DATABASE_NAME": "test", "DATABASE_USERNAME": "test",
+    "EMAIL_HOST_USER": "test@example.com", "EMAIL_HOST_PASSWORD": "test",
+    "DEFAULT_FROM_EMAIL": "test@example.com", "EMAIL_HOST": "localhost", "EMAIL_PORT": "587",
+    "EMAIL_USE_TLS": "true", "EMAIL_USE_SSL": "false",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30", "REFRESH_TOKEN_EXPIRE_DAYS": "7", "SECRET_KEY": "test",
+    "DEFAULT_ADMIN_EMAIL": "admin@example.com", "ADMIN_PASSWORD": "test", "UPLOAD_DIR": "/tmp",
+    "BASE_PRICE_PER_KM": "1", "WEIGHT_PRICE_PER_KG": "1", "DEMAND_MULTIPLIER": "1",
+    "GPS_FRESHNESS_MINUTES": "5", "PAYSTACK_SECRET_KEY": "test", "FRONTEND_URL": "http://localhost",
+}.items():
+    os.environ.setdefault(key, value)
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.pool import NullPool
+
+from app.core import database
+from app.core.base import Base
+from app.core.query_stats import instrument
+from app.core.security import create_access_token
+from app.main import app
+from app.models.common import Geography
+from app.models.order import Order, OrderStatus
+from app.models.user import User, UserRole
+
+
+# The suite runs on SQLite; render the PostgreSQL-only column types as plain storage.
+@compiles(JSONB, "sqlite")
+def _jsonb_on_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+@compiles(Geography, "sqlite")
+def _geography_on_sqlite(type_, compiler, **kw):
+    return "BLOB"
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # NullPool: every checkout is a fresh connection, so checkouts and
+    # checkins map one to one onto connections taken and returned.
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}", poolclass=NullPool)
+    instrument(engine)
+
+    async def create_all():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_all())
+    yield engine
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def pg_engine():
+    """Engine on ``TEST_DATABASE_URL``, a migrated, disposable PostgreSQL
+    (PostGIS) database, for the tests that need the real planner or locking.
+    Skipped when it is not set."""
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    engine = create_async_engine(url, poolclass=NullPool)
+    yield engine
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def pg_session_factory(pg_engine):
+    from benchmarks.pg import delete_seeded
+
+    session_factory = async_sessionmaker(bind=pg_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    yield session_factory
+
+    async def cleanup():
+        async with session_factory() as db:
+            await delete_seeded(db)
+
+    asyncio.run(cleanup())
+
+
+@pytest.fixture
+def session_factory(engine):
+    return async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+@pytest.fixture
+def db_usage(engine):
+    """Sessions opened and connections checked out/in while serving requests."""
+    usage = {"sessions_opened": 0, "sessions_closed": 0, "checkouts": 0, "checkins": 0}
+    event.listen(engine.sync_engine.pool, "checkout", lambda *args: usage.update(checkouts=usage["checkouts"] + 1))
+    event.listen(engine.sync_engine.pool, "checkin", lambda *args: usage.update(checkins=usage["checkins"] + 1))
+    return usage
+
+
+@pytest.fixture
+def client(session_factory, db_usage):
+    async def get_test_db():
+        db_usage["sessions_opened"] += 1
+        try:
+            async with session_factory() as db:
+                yield db
+        finally:
+            db_usage["sessions_closed"] += 1
+
+    app.dependency_overrides[database.get_db] = get_test_db
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def create_user(session_factory, db_usage):
+    """Insert a user and return an access token for it; resets ``db_usage``."""
+    def create(email: str, role: UserRole = UserRole.CUSTOMER, **values) -> tuple[User, str]:
+        async def insert():
+            async with session_factory() as db:
+                user = User(email=email, first_name="Test", last_name="User", password="x",
+                            is_verified=True, role=role, **values)
+                db.add(user)
+                await db.commit()
+                return user
+
+        user = asyncio.run(insert())
+        for key in db_usage:
+            db_usage[key] = 0
+        return user, create_access_token({"sub": email}, user.token_version)
+
+    return create
+
+
+@pytest.fixture
+def create_order(session_factory):
+    def create(customer: User, driver: User | None = None, status: OrderStatus = OrderStatus.CREATED) -> Order:
+        async def insert():
+            async with session_factory() as db:
+                location = {"type": "Point", "coordinates": [3.38, 6.52]}
+                order = Order(
+                    customer_id=customer.id,
+                    driver_id=driver.id if driver else None,
+                    pickup_location=location,
+                    delivery_location=location,
+                    package_details={"weight_kg": 1.0, "dimensions_cm": [10.0, 10.0, 10.0]},
+                    recipient_details={"name": "Recipient", "phone": "+2340000000000"},
+                    price=10.0,
+                    status=status,
+                )
+                db.add(order)
+                await db.commit()
+                return order
+
+        return asyncio.run(insert())
+
+    return create
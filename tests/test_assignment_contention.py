@@ -0,0 +1,39 @@
+import asyncio
+
+import numpy as np
+
+from app.models.user import UserRole
+from benchmarks.assignment_contention import CENTER, check, run_workers
+from benchmarks.pg import seed_drivers, seed_orders, seed_users
+
+
+def test_racing_processes_never_double_assign(pg_engine, pg_session_factory):
+    rng = np.random.default_rng(11)
+
+    def positions(n):
+        return list(zip(CENTER[0] + rng.uniform(-0.05, 0.05, n), CENTER[1] + rng.uniform(-0.05, 0.05, n)))
+
+    async def seed():
+        async with pg_session_factory() as db:
+            driver_ids = await seed_drivers(db, positions(40))
+            customer_ids = await seed_users(db, 2, UserRole.CUSTOMER)
+            order_ids = await seed_orders(db, customer_ids, positions(120))
+        return order_ids, driver_ids
+
+    async def verify(order_ids, driver_ids):
+        async with pg_session_factory() as db:
+            return await check(db, order_ids, driver_ids)
+
+    order_ids, driver_ids = asyncio.run(seed())
+    # More orders than drivers, all in a few km: every process fights over both.
+    _, assigned, _ = run_workers(pg_engine.url.render_as_string(hide_password=False), order_ids, processes=4)
+    result = asyncio.run(verify(order_ids, driver_ids))
+
+    assert result["assigned"] == assigned > 0
+    assert result == {
+        "assigned": assigned,
+        "overbooked_drivers": 0,
+        "load_mismatches": 0,
+        "double_claimed_orders": 0,
+        "unrecorded_orders": 0,
+    }
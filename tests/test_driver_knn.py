@@ -0,0 +1,41 @@
+import asyncio
+
+import numpy as np
+from sqlalchemy import event
+
+from app.services.logistics import nearest_drivers
+from benchmarks.pg import seed_drivers
+
+
+def test_nearest_driver_uses_the_gist_knn_index(pg_engine, pg_session_factory):
+    rng = np.random.default_rng(7)
+    positions = list(zip(3.38 + rng.uniform(-0.45, 0.45, 5000), 6.52 + rng.uniform(-0.45, 0.45, 5000)))
+    executed = []
+
+    def capture(connection, cursor, statement, parameters, context, executemany):
+        if "<->" in statement:
+            executed.append((statement, parameters))
+
+    async def explain() -> str:
+        async with pg_session_factory() as db:
+            await seed_drivers(db, positions)
+        async with pg_engine.connect() as connection:
+            await connection.exec_driver_sql("ANALYZE driver_locations")
+            await connection.exec_driver_sql("ANALYZE users")
+            await connection.commit()
+        event.listen(pg_engine.sync_engine, "before_cursor_execute", capture)
+        try:
+            async with pg_session_factory() as db:
+                await nearest_drivers(db, 3.38, 6.52)
+                await db.rollback()
+        finally:
+            event.remove(pg_engine.sync_engine, "before_cursor_execute", capture)
+        statement, parameters = executed[0]
+        # EXPLAIN exactly the statement nearest_drivers sent.
+        async with pg_engine.connect() as connection:
+            plan = (await connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)).scalars().all()
+        return "\n".join(plan)
+
+    plan = asyncio.run(explain())
+
+    assert "Index Scan using ix_driver_locations_position" in plan, plan
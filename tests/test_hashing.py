@@ -0,0 +1,19 @@
+import asyncio
+import os
+
+from app.core.hashing import PasswordHasher, _context
+
+
+def test_hasher_replaces_a_broken_pool():
+    hasher = PasswordHasher(max_workers=1, max_queue=1)
+    hasher.start()
+    try:
+        # A worker that dies takes the whole pool down with it.
+        hasher._get_executor().submit(os._exit, 1).exception(timeout=60)
+
+        hashed = asyncio.run(hasher.hash("correct horse"))
+
+        assert _context(4).identify(hashed) == "bcrypt"
+        assert hasher.metrics()["restarts"] == 1
+    finally:
+        hasher.shutdown()
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from app.core.principals import principal_cache
+from app.models.order import OrderStatus, OrderStatusHistory, ProofOfDelivery
+from app.models.user import UserRole
+
+
+@pytest.fixture
+def delivered_order(session_factory, create_user, create_order):
+    """A delivered order with ``history_length`` history rows, each by a distinct user."""
+    def create(history_length: int):
+        customer, _ = create_user(f"customer-{history_length}@example.com")
+        driver, _ = create_user(f"driver-{history_length}@example.com", UserRole.DISPATCHER, staff_id=f"STF{history_length:03d}")
+        authors = [create_user(f"author-{history_length}-{i}@example.com")[0] for i in range(history_length)]
+        order = create_order(customer, driver, OrderStatus.DELIVERED)
+
+        async def insert():
+            async with session_factory() as db:
+                db.add_all(
+                    OrderStatusHistory(order_id=order.id, status=OrderStatus.CREATED, changed_by_id=author.id)
+                    for author in authors
+                )
+                db.add(ProofOfDelivery(order_id=order.id, image_path="/tmp/image.png"))
+                await db.commit()
+
+        asyncio.run(insert())
+        return order
+
+    return create
+
+
+@pytest.mark.parametrize("history_length", [1, 10])
+def test_full_order_loads_in_a_fixed_number_of_queries(client, create_user, delivered_order, history_length):
+    order = delivered_order(history_length)
+    admin, token = create_user("admin@example.com", UserRole.ADMIN, staff_id="ADM002")
+    principal_cache.invalidate(admin.email)
+
+    response = client.get(f"/order/{order.id}", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200, response.text
+    data = response.json()["data"]
+    assert len(data["status_history"]) == history_length
+    assert all(entry["changed_by"] for entry in data["status_history"])
+    assert data["proof_of_delivery"]["uploaded_at"]
+    # One to authenticate, one for the order with its to-one relations, one
+    # for the history with its authors, however long the history is.
+    assert response.headers["X-DB-Queries"] == "3"
@@ -0,0 +1,54 @@
+import pytest
+
+from app.models.order import OrderStatus
+from app.models.user import UserRole
+
+
+def update_status(client, token, order, new_status):
+    return client.post(
+        f"/order/{order.id}/update-status",
+        json={"status": new_status.value},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+
+def test_customer_cannot_cancel_another_customers_order(client, create_user, create_order):
+    owner, _ = create_user("owner@example.com")
+    _, other_token = create_user("other@example.com")
+    order = create_order(owner)
+
+    response = update_status(client, other_token, order, OrderStatus.CANCELLED)
+
+    assert response.status_code == 403
+
+
+def test_customer_can_cancel_own_order(client, create_user, create_order):
+    owner, token = create_user("owner@example.com")
+    order = create_order(owner)
+
+    response = update_status(client, token, order, OrderStatus.CANCELLED)
+
+    assert response.status_code == 200, response.text
+    assert response.json()["data"]["status"] == OrderStatus.CANCELLED.value
+
+
+@pytest.mark.parametrize("new_status", [OrderStatus.PICKED_UP, OrderStatus.FAILED, OrderStatus.CANCELLED])
+def test_driver_cannot_move_an_order_assigned_to_someone_else(client, create_user, create_order, new_status):
+    customer, _ = create_user("customer@example.com")
+    assigned, _ = create_user("assigned@example.com", UserRole.DISPATCHER, staff_id="STF001")
+    _, other_token = create_user("other-driver@example.com", UserRole.DISPATCHER, staff_id="STF002")
+    order = create_order(customer, assigned, OrderStatus.ASSIGNED)
+
+    response = update_status(client, other_token, order, new_status)
+
+    assert response.status_code == 403
+
+
+def test_assignment_only_goes_through_claim(client, create_user, create_order):
+    customer, _ = create_user("customer@example.com")
+    _, driver_token = create_user("driver@example.com", UserRole.DISPATCHER, staff_id="STF001")
+    order = create_order(customer)
+
+    response = update_status(client, driver_token, order, OrderStatus.ASSIGNED)
+
+    assert response.status_code == 400
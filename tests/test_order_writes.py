@@ -0,0 +1,143 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.core.principals import principal_cache
+from app.models.order import OrderStatusHistory
+from app.models.payment import Payment
+from app.models.user import UserRole
+from app.services import logistics, order as order_service, payment as payment_service
+
+
+async def _no_email(**kwargs):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def no_email(monkeypatch):
+    monkeypatch.setattr(order_service, "send_order_confirmation_email", _no_email)
+    monkeypatch.setattr(payment_service, "send_driver_assignment_email", _no_email)
+    monkeypatch.setattr(payment_service, "send_payment_success_email", _no_email)
+
+
+@pytest.fixture
+def authenticated(create_user):
+    """``create_user`` with the principal cache cleared for the user, so every
+    request pays the same single authentication SELECT."""
+    def create(email: str, role: UserRole = UserRole.CUSTOMER, **values):
+        user, token = create_user(email, role, **values)
+        principal_cache.invalidate(email)
+        return user, {"Authorization": f"Bearer {token}"}
+
+    return create
+
+
+@pytest.fixture
+def nearest(monkeypatch):
+    """Serve the KNN candidates (a PostGIS query) from a list."""
+    candidates = []
+
+    async def nearest_drivers(db, lon, lat, exclude=()):
+        return list(candidates)
+
+    monkeypatch.setattr(logistics, "nearest_drivers", nearest_drivers)
+    return candidates
+
+
+def history(session_factory, order_id) -> list:
+    async def load():
+        async with session_factory() as db:
+            return (await db.execute(
+                OrderStatusHistory.__table__.select().where(OrderStatusHistory.order_id == order_id)
+            )).all()
+
+    return asyncio.run(load())
+
+
+def test_create_order_writes_order_and_history_in_one_flush(client, authenticated):
+    _, headers = authenticated("customer@example.com")
+    location = {"type": "Point", "coordinates": [3.38, 6.52]}
+    order = {
+        "pickup_location": location,
+        "delivery_location": location,
+        "package_details": {"weight_kg": 1.0, "dimensions_cm": [10.0, 10.0, 10.0]},
+        "recipient_details": {"name": "Recipient", "phone": "+2340000000000"},
+    }
+
+    response = client.post("/order/", data={"order": json.dumps(order)}, headers=headers)
+
+    assert response.status_code == 201, response.text
+    # Authenticate, INSERT the order, INSERT its CREATED history row.
+    assert response.headers["X-DB-Queries"] == "3"
+
+
+def test_update_status_is_one_conditional_update(client, authenticated, create_order, session_factory):
+    customer, headers = authenticated("customer@example.com")
+    order = create_order(customer)
+
+    response = client.post(f"/order/{order.id}/update-status", json={"status": "cancelled"}, headers=headers)
+
+    assert response.status_code == 200, response.text
+    # Authenticate, load the order, UPDATE ... RETURNING, INSERT history.
+    assert response.headers["X-DB-Queries"] == "4"
+    assert len(history(session_factory, order.id)) == 1
+
+
+def test_assign_driver_claims_in_one_transaction(client, authenticated, create_order, nearest, session_factory):
+    customer, _ = authenticated("customer@example.com")
+    driver, _ = authenticated("driver@example.com", UserRole.DISPATCHER, staff_id="STF001")
+    _, headers = authenticated("dispatcher@example.com", UserRole.DISPATCHER, staff_id="STF002")
+    order = create_order(customer)
+    nearest.append(driver)
+
+    response = client.post(f"/order/{order.id}/assign-driver", headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert response.json()["data"]["driver_id"] == str(driver.id)
+    # Authenticate, lock the order, claim the driver's capacity, UPDATE ...
+    # RETURNING the order, INSERT history; then the customer and the driver
+    # for the response.
+    assert response.headers["X-DB-Queries"] == "7"
+    assert len(history(session_factory, order.id)) == 1
+
+
+class PaystackStub:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def get(self, url, **kwargs):
+        return httpx.Response(200, json={"status": True, "data": {"status": "success"}})
+
+
+def test_verify_payment_commits_payment_and_assignment_together(
+    client, authenticated, create_order, nearest, session_factory, monkeypatch
+):
+    monkeypatch.setattr(payment_service.httpx, "AsyncClient", PaystackStub)
+    customer, headers = authenticated("customer@example.com")
+    driver, _ = authenticated("driver@example.com", UserRole.DISPATCHER, staff_id="STF001")
+    order = create_order(customer)
+    nearest.append(driver)
+
+    async def insert_payment():
+        async with session_factory() as db:
+            db.add(Payment(reference="ref-1", amount=10.0, customer_id=customer.id, order_id=order.id))
+            await db.commit()
+
+    asyncio.run(insert_payment())
+
+    response = client.post("/payment/verify-payment", params={"reference": "ref-1"}, headers=headers)
+
+    assert response.status_code == 200, response.text
+    # Authenticate, load the payment, lock the order, claim the driver, UPDATE
+    # ... RETURNING the order, then one flush: the payment and verification
+    # UPDATEs and the history INSERT.
+    assert response.headers["X-DB-Queries"] == "8"
+    assert len(history(session_factory, order.id)) == 1
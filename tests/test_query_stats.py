@@ -0,0 +1,82 @@
+import json
+import logging
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.core.config import settings
+from app.core.query_stats import _explain, instrument
+
+
+class RecordingCursor:
+    def __init__(self, executed, fail_on):
+        self.executed = executed
+        self.fail_on = fail_on
+
+    def execute(self, statement, parameters=None):
+        self.executed.append(statement)
+        if statement.startswith(self.fail_on):
+            raise RuntimeError("explain failed")
+
+    def fetchall(self):
+        return [("Seq Scan on orders",)]
+
+    def close(self):
+        pass
+
+
+class RecordingConnection:
+    def __init__(self, fail_on="never", autocommit=False):
+        self.executed = []
+        self.autocommit = autocommit
+        self.fail_on = fail_on
+
+    @property
+    def connection(self):
+        return self
+
+    def cursor(self):
+        return RecordingCursor(self.executed, self.fail_on)
+
+
+def test_explain_runs_inside_a_savepoint():
+    connection = RecordingConnection()
+
+    assert _explain(connection, "SELECT 1", ()) == "Seq Scan on orders"
+    assert connection.executed == ["SAVEPOINT query_stats_explain", "EXPLAIN SELECT 1", "RELEASE SAVEPOINT query_stats_explain"]
+
+
+def test_failed_explain_rolls_back_only_its_savepoint():
+    connection = RecordingConnection(fail_on="EXPLAIN")
+
+    with pytest.raises(RuntimeError):
+        _explain(connection, "SELECT 1", ())
+    assert connection.executed == [
+        "SAVEPOINT query_stats_explain",
+        "EXPLAIN SELECT 1",
+        "ROLLBACK TO SAVEPOINT query_stats_explain",
+        "RELEASE SAVEPOINT query_stats_explain",
+    ]
+
+
+def test_explain_skips_the_savepoint_in_autocommit():
+    connection = RecordingConnection(autocommit=True)
+
+    _explain(connection, "SELECT 1", ())
+    assert connection.executed == ["EXPLAIN SELECT 1"]
+
+
+def test_slow_statements_are_explained_without_breaking_the_transaction(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "sql_slow_query_ms", 0)
+    engine = create_engine("sqlite://")
+    instrument(engine)
+
+    with caplog.at_level(logging.WARNING, logger="app.core.query_stats"), engine.begin() as connection:
+        # EXPLAIN of the CREATE fails once the table exists; the transaction goes on.
+        connection.exec_driver_sql("CREATE TABLE t (x INTEGER)")
+        connection.exec_driver_sql("INSERT INTO t VALUES (1)")
+        assert connection.exec_driver_sql("SELECT x FROM t").scalar() == 1
+
+    assert any(record.getMessage() == "EXPLAIN of slow statement failed" for record in caplog.records)
+    slow = [json.loads(record.getMessage()) for record in caplog.records if record.levelno == logging.WARNING]
+    assert any(entry["statement"] == "SELECT x FROM t" and entry["plan"] for entry in slow)
@@ -0,0 +1,30 @@
+from app.models.user import UserRole
+
+
+def test_authenticated_request_uses_one_session_and_connection(client, create_user, db_usage):
+    _, token = create_user("dispatcher@example.com", UserRole.DISPATCHER)
+
+    response = client.post("/users/logout-all", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    # get_current_user and the handler share the request's session, and its
+    # single connection is returned to the pool by the end of the request.
+    assert db_usage == {"sessions_opened": 1, "sessions_closed": 1, "checkouts": 1, "checkins": 1}
+
+
+def test_rejected_request_still_closes_its_session(client, db_usage):
+    response = client.post("/users/logout-all", headers={"Authorization": "Bearer not-a-token"})
+
+    assert response.status_code == 401
+    assert db_usage["sessions_opened"] == db_usage["sessions_closed"] == 1
+    assert db_usage["checkouts"] == db_usage["checkins"]
+
+
+def test_read_request_on_primary_shares_the_auth_session(client, create_user, db_usage):
+    _, token = create_user("customer@example.com")
+
+    response = client.get("/order/", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200, response.text
+    # Without a usable replica get_read_db hands out the get_db session.
+    assert db_usage == {"sessions_opened": 1, "sessions_closed": 1, "checkouts": 1, "checkins": 1}
@@ -0,0 +1,47 @@
+import asyncio
+
+from sqlalchemy import update
+
+from app.models.order import Order, OrderStatus
+from app.services.surge import SurgeEngine
+
+
+def make_engine() -> SurgeEngine:
+    return SurgeEngine(5, 300, 0.5, 3.0, 3600, 300, 15)
+
+
+def sync(engine: SurgeEngine, session_factory):
+    async def run():
+        async with session_factory() as db:
+            await engine.sync(db)
+
+    asyncio.run(run())
+
+
+def test_sync_closes_orders_claimed_on_another_worker(session_factory, create_user, create_order):
+    customer, _ = create_user("customer@example.com")
+    order = create_order(customer)
+    opening_worker = make_engine()
+    opening_worker.order_opened(order.id, 3.38, 6.52)
+
+    async def claim_elsewhere():
+        async with session_factory() as db:
+            await db.execute(update(Order).where(Order.id == order.id).values(status=OrderStatus.ASSIGNED))
+            await db.commit()
+
+    asyncio.run(claim_elsewhere())
+    assert opening_worker.metrics()["open_orders"] == 1
+    sync(opening_worker, session_factory)
+
+    assert opening_worker.metrics()["open_orders"] == 0
+
+
+def test_sync_counts_orders_opened_on_other_workers(session_factory, create_user, create_order):
+    customer, _ = create_user("customer@example.com")
+    for _ in range(3):
+        create_order(customer)
+    worker = make_engine()
+
+    sync(worker, session_factory)
+
+    assert worker.metrics()["open_orders"] == 3